@@ -2,6 +2,7 @@ import os
 import re
 import glob
 import pandas as pd
+from insitu.tableio import write_table
 
 def parse_filename(filename):
     """解析文件名并返回时间信息和总秒数"""
@@ -15,11 +16,8 @@ def parse_filename(filename):
     total_seconds = hh * 3600 + mm * 60 + ss + ms / 1000.0
     return time_str, total_seconds
 
-def main():
-    # 用户输入路径
-    input_folder = r'E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\2025_03-09 161526'
-    output_path = r'E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video_timestamps.xlsx'
-
+def export_video_timestamps(input_folder, output_path):
+    """导出文件夹中各图像相对第一张图像的时间差"""
     # 收集有效文件数据
     files_data = []
     for filepath in glob.glob(os.path.join(input_folder, 'image-*.jpg')):
@@ -47,10 +45,17 @@ def main():
             "时间差(s)": time_diff
         })
 
-    # 创建并保存DataFrame
+    # 创建并保存DataFrame，格式由扩展名决定（Excel/Parquet/Feather/CSV）
     df = pd.DataFrame(results)
-    df.to_excel(output_path, index=False)
+    write_table(df, output_path)
     print(f"文件已成功生成：{output_path}")
 
+def main():
+    # 用户输入路径
+    input_folder = r'E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\2025_03-09 161526'
+    output_path = r'E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video_timestamps.xlsx'
+
+    export_video_timestamps(input_folder, output_path)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,43 +1,23 @@
 import pandas as pd
-from datetime import datetime
+import numpy as np
+from insitu.timeparse import parse_time_seconds
+from insitu.tableio import read_table, write_table
 
 def calculate_time_differences(input_excel_path, output_excel_path, sheet_name='raw'):
-    # 读取Excel文件中的指定工作表
-    df = pd.read_excel(input_excel_path, sheet_name=sheet_name)
+    # 读取指定工作表，格式由扩展名决定（Excel/Parquet/Feather/CSV）
+    df = read_table(input_excel_path, sheet_name=sheet_name)
     
     # 确保 'Time(Sec)' 列存在
     if 'Time(Sec)' not in df.columns:
         raise ValueError("工作表中不存在 'Time(Sec)' 列")
     
-    # 初始化一个空列表来存储时间差
-    time_differences = []
-    base_time = None
-    
-    # 遍历每一行，计算时间差
-    for _, row in df.iterrows():
-        # 解析当前时间
-        current_time_str = row['Time(Sec)']
-        try:
-            # 尝试解析为 "HH:MM:SS fff" 格式
-            current_time = datetime.strptime(current_time_str, '%H:%M:%S %f')
-        except ValueError:
-            try:
-                # 尝试解析为 "HH:MM:SS" 格式
-                current_time = datetime.strptime(current_time_str, '%H:%M:%S')
-            except ValueError:
-                # 如果解析失败，跳过这一行
-                time_differences.append(None)
-                continue
-        
-        # 如果是第一行，设置为基准时间
-        if base_time is None:
-            base_time = current_time
-            time_diff = 0.0
-        else:
-            # 计算与基准时间的时间差（以秒为单位）
-            time_diff = (current_time - base_time).total_seconds()
-        
-        time_differences.append(time_diff)
+    # 向量化解析 "HH:MM:SS fff" / "HH:MM:SS" 两种格式，解析失败的行为 NaN
+    seconds = parse_time_seconds(df['Time(Sec)'])
+    valid = ~np.isnan(seconds)
+
+    # 以第一条有效时间为基准，计算时间差（以秒为单位）
+    base_time = seconds[valid][0] if valid.any() else np.nan
+    time_differences = seconds - base_time
     
     # 创建一个新的DataFrame，只包含时间和时间差两列
     result_df = pd.DataFrame({
@@ -45,8 +25,8 @@ def calculate_time_differences(input_excel_path, output_excel_path, sheet_name='
         'Time Difference (s)': time_differences
     })
     
-    # 将结果保存到新的Excel文件
-    result_df.to_excel(output_excel_path, index=False)
+    # 将结果保存到新的文件，格式由扩展名决定
+    write_table(result_df, output_excel_path)
     print(f"时间差计算完成，结果已保存到: {output_excel_path}")
 
 if __name__ == "__main__":
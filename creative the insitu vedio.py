@@ -1,7 +1,15 @@
 import cv2
 import os
+from insitu.instrument import instrumented
+from insitu.pipeline import ThroughputMeter
+from insitu.framegraph import iter_image_frames, run_frame_graph, write_frame_list, VideoSink, AnnotatedVideoSink
+from insitu.framestore import FrameStore
+from insitu.transform import FrameTransform
 
-def create_video_from_images(image_folder, output_video_path_cropped_with_name, output_video_path_cropped_without_name, frame_rate, codec, crop_area=None):
+@instrumented
+def create_video_from_images(image_folder, output_video_path_cropped_with_name, output_video_path_cropped_without_name, frame_rate, codec, crop_area=None, workers=None,
+                             split_image=None, output_video_part1=None, output_video_part2=None, encoder_options=None,
+                             frame_store=None, output_size=None):
     images = [img for img in os.listdir(image_folder) if img.endswith(".jpg")]
     print(f"Found {len(images)} images in the folder.")
     images.sort()
@@ -18,47 +26,71 @@ def create_video_from_images(image_folder, output_video_path_cropped_with_name,
         return
     
     height, width = first_image.shape[:2]
-    fourcc = cv2.VideoWriter_fourcc(*codec)
-    
-    # Create two video writers: one with names and one without
-    video_with_name = cv2.VideoWriter(output_video_path_cropped_with_name, fourcc, frame_rate, (width, height))
-    video_without_name = cv2.VideoWriter(output_video_path_cropped_without_name, fourcc, frame_rate, (width, height))
-
-    for image in images:
-        img_path = os.path.join(image_folder, image)
-        img = cv2.imread(img_path)
+    # 裁剪后的输出尺寸，默认缩放回原图尺寸；设为裁剪尺寸时不缩放
+    if output_size is None:
+        output_size = (width, height)
 
-        if img is None:
-            print(f"Warning: Unable to read image at {img_path}. Skipping...")
-            continue
+    # 一路解码同时输出带名称、不带名称两个视频
+    sinks = [
+        AnnotatedVideoSink(output_video_path_cropped_with_name, codec, frame_rate, encoder_options=encoder_options),
+        VideoSink(output_video_path_cropped_without_name, codec, frame_rate, encoder_options=encoder_options),
+    ]
 
-        if crop_area:
-            x, y, w, h = crop_area
-            cropped_img = img[y:y+h, x:x+w]
-            cropped_img = cv2.resize(cropped_img, (width, height))
+    # 同一遍解码中按 split_image 拆分出带名称的前后两段，供合并脚本直接使用；
+    # 两段按源图像顺序划分，各自写出帧列表，拆分点在视频中的位置以实际写入的帧为准
+    if split_image is not None:
+        if split_image not in images:
+            print(f"Error: Split image {split_image} not found in the folder.")
+            return
+        split_index = images.index(split_image)
+        part1 = AnnotatedVideoSink(output_video_part1, codec, frame_rate, stop=split_index, encoder_options=encoder_options)
+        part2 = AnnotatedVideoSink(output_video_part2, codec, frame_rate, start=split_index, encoder_options=encoder_options)
+        sinks += [part1, part2]
 
-            # Write cropped image to video with name
-            img_with_name = cropped_img.copy()  # 创建一个副本用于添加名称
-            cv2.putText(img_with_name, image, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, cv2.LINE_AA)
-            video_with_name.write(img_with_name)
-            print(f"Wrote cropped image with name to video: {img_path}")
+    # 线程池提前解码、裁剪后续帧，主线程作为唯一的写入者按原顺序分发给各输出端
+    meter = ThroughputMeter("Encoding", total=len(images))
+    if frame_store is not None:
+        # 裁剪后的帧只解码一次保存在内存映射的帧存储中，再次生成视频时直接切片读取
+        store = FrameStore.open_or_build(image_folder, frame_store, crop_area, workers=workers)
+        store_width, store_height = store.frame_size
+        transform = FrameTransform((0, 0, store_width, store_height), output_size if crop_area else None)
+        frames = ((index, name, transform(frame) if frame is not None else frame)
+                  for index, name, frame in store.iter_frames())
+    else:
+        image_paths = [os.path.join(image_folder, image) for image in images]
+        frames = iter_image_frames(image_paths, crop_area, output_size, workers)
+    run_frame_graph(frames, sinks, meter)
+    if split_image is not None:
+        # 两段的帧列表记录同一遍写出的带名称视频，合并脚本据此判断两段是否与该视频一致
+        for part in (part1, part2):
+            if part.names:
+                write_frame_list(part.path, part.names, source=output_video_path_cropped_with_name)
 
-            # Write cropped image to video without name
-            video_without_name.write(cropped_img)
-            print(f"Wrote cropped image without name to video: {img_path}")
-
-    video_with_name.release()
-    video_without_name.release()
     print(f"Cropped video with names saved to {output_video_path_cropped_with_name}")
     print(f"Cropped video without names saved to {output_video_path_cropped_without_name}")
-    cv2.destroyAllWindows()
+    if split_image is not None:
+        # 读取失败被跳过的图像不占帧序号，拆分点即第一段实际写入的帧数
+        print(f"Split videos saved to {output_video_part1} and {output_video_part2} (split at video frame {part1.frame_count})")
+        if part2.names[:1] != [split_image]:
+            print(f"Warning: Split image {split_image} could not be read, part 2 starts at {(part2.names or ['-'])[0]}")
+    meter.report()
 
 if __name__ == "__main__":
     image_folder = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\2025_03-09 161526"
     output_video_path_cropped_with_name = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\output_video_cropped_with_name.avi"
     output_video_path_cropped_without_name = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\output_video_cropped_without_name.avi"
     frame_rate = 24
-    codec = 'XVID'
+    codec = 'XVID'  # OpenCV FourCC；也可用 'x264'、'x265' 或无损的 'ffv1'（通过 ffmpeg 管道编码）
+    encoder_options = None  # ffmpeg 编码参数，如 {'preset': 'veryfast', 'crf': 20, 'threads': 8}
     crop_area = (15, 92, 935, 935)  # 裁剪区域 (x起始像素, y起始像素, x像素宽度, y像素高度)
+    output_size = None  # 输出视频尺寸 (宽, 高)，None 表示缩放回原图尺寸；设为 (935, 935) 时不缩放，编码也更快
+    workers = None  # 并行解码线程数，None 表示使用全部 CPU 核心，1 表示串行
+    frame_store = None  # 帧存储目录，给定时裁剪帧只解码一次，重复生成视频时直接复用（None 表示每次重新解码）
+
+    # 在同一遍解码中拆分出合并脚本需要的前后两段（不需要时设为 None）
+    split_image = "image-161547_677.jpg"
+    output_video_part1 = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\output_video_part1.avi"
+    output_video_part2 = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\output_video_part2.avi"
 
-    create_video_from_images(image_folder, output_video_path_cropped_with_name, output_video_path_cropped_without_name, frame_rate, codec, crop_area)
\ No newline at end of file
+    create_video_from_images(image_folder, output_video_path_cropped_with_name, output_video_path_cropped_without_name, frame_rate, codec, crop_area, workers,
+                             split_image, output_video_part1, output_video_part2, encoder_options, frame_store, output_size)
\ No newline at end of file
@@ -1,170 +1,197 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-import cv2
 import os
-import time
-import re
-from datetime import datetime, timedelta
-from scipy.signal import savgol_filter
-
-def parse_filename(filename):
-    """解析文件名并返回时间信息和总秒数"""
-    pattern = r'^image-(\d{2})(\d{2})(\d{2})_(\d{3})\.jpg$'
-    match = re.match(pattern, filename)
-    if not match:
-        return None, None
-    
-    hh, mm, ss, ms = map(int, match.groups())
-    total_seconds = hh * 3600 + mm * 60 + ss + ms / 1000.0
-    return f"{hh:02}{mm:02}{ss:02}_{ms:03}", total_seconds
-
-def create_stress_strain_video(input_file_path, output_video_path, sheet_name='input_data', speed_factor=50, xlim=None, ylim=None):
+from insitu.decimate import decimate_to_frames
+from insitu.encoder import open_writer
+from insitu.instrument import get_recorder, instrumented
+from insitu.render import StressStrainRenderer
+from insitu.timeline import TimeAxis, StreamingTimeAxis, FrameClock
+from insitu.tableio import read_table, write_table, iter_table_chunks, TableAppender
+from insitu.smoothing import savgol_smooth, StreamingSavgol
+
+@instrumented
+def smooth_stress_strain(input_file_path, sheet_name='input_data', speed_factor=50, window_length=37, polyorder=2,
+                         output_file_path=None):
+    """读取并平滑 ε/σ 数据，写出平滑数据表，返回 (时间轴, 平滑 ε, 平滑 σ, 平滑数据文件路径)
+
+    output_file_path 为 None 时写到输入文件旁的 <名称>_smoothed 表（与输入同格式）。
+    """
+    # 读取数据表，格式由扩展名决定（Excel/Parquet/Feather/CSV）
+    data = read_table(input_file_path, sheet_name=sheet_name)
+    first_column = data.columns[0]
+
+    # 时间处理逻辑：构建加速后的播放时间轴（秒），并剔除时间无效的行
+    time_axis = TimeAxis.from_column(data[first_column], speed_factor)
+    skipped = len(data) - len(time_axis)
+    if skipped:
+        print(f"跳过 {skipped} 行无效的 {first_column} 数据")
+    valid_indices = time_axis.valid_indices
+
+    # 过滤有效数据
+    valid_data = data.iloc[valid_indices].reset_index(drop=True)
+    epsilon = valid_data['ε (%)']
+    sigma = valid_data['σ (MPa)']
+
+    # 数据平滑处理
+    # 窗口自动缩小为不超过数据长度的奇数，短数据也能正常平滑
+    smoothed_epsilon = savgol_smooth(epsilon, window_length, polyorder)
+    smoothed_sigma = savgol_smooth(sigma, window_length, polyorder)
+
+    # 将平滑后的数据保存到与输入同格式的新文件
+    if output_file_path is None:
+        stem, ext = os.path.splitext(input_file_path)
+        output_file_path = f"{stem}_smoothed{ext}"
+    output_file_dir = os.path.dirname(output_file_path)
+    if output_file_dir and not os.path.exists(output_file_dir):
+        os.makedirs(output_file_dir)
+
+    smoothed_data = pd.DataFrame({'Smoothed ε (%)': smoothed_epsilon, 'Smoothed σ (MPa)': smoothed_sigma})
+    output_file_path = write_table(smoothed_data, output_file_path, sheet_name='Smoothed_Data')
+    return time_axis, smoothed_epsilon, smoothed_sigma, output_file_path
+
+@instrumented
+def create_stress_strain_video(input_file_path, output_video_path, sheet_name='input_data', speed_factor=50, xlim=None, ylim=None, timeline=False,
+                               codec='XVID', encoder_options=None, decimate=None, smoothed_file_path=None):
     try:
-        # 读取Excel文件
-        data = pd.read_excel(input_file_path, sheet_name=sheet_name)
-        first_column = data.columns[0]
-
-        # 公共数据准备
-        epsilon = data['ε (%)']
-        sigma = data['σ (MPa)']
-        valid_indices = []
-        cumulative_time = []
-
-        # 时间处理逻辑
-        if first_column == 'Time(Sec)':
-            elapsed_time = data[first_column].astype(str)
-            time_points = []
-            
-            for idx, time_str in enumerate(elapsed_time):
-                try:
-                    parts = time_str.split(':')
-                    if len(parts) == 3:
-                        hours, minutes, seconds = map(float, parts)
-                    elif len(parts) == 2:
-                        minutes, seconds = map(float, parts)
-                        hours = 0
-                    else:
-                        raise ValueError("无效时间格式")
-                    
-                    total_seconds = hours * 3600 + minutes * 60 + seconds
-                    time_points.append(total_seconds)
-                    valid_indices.append(idx)
-                except Exception as e:
-                    print(f"跳过无效时间格式: {time_str} - {e}")
-                    continue
-
-            # 计算累积时间
-            base_time = datetime.strptime("00:00:00.000", "%H:%M:%S.%f")
-            cumulative_time = [base_time + timedelta(seconds=(sum(time_points[:i]) / speed_factor)) 
-                              for i in range(len(time_points))]
-
-        elif first_column == 'File name':
-            filenames = data[first_column].astype(str)
-            time_seconds = []
-            
-            for idx, filename in enumerate(filenames):
-                _, total_seconds = parse_filename(filename)
-                if total_seconds is not None:
-                    time_seconds.append(total_seconds)
-                    valid_indices.append(idx)
-                else:
-                    print(f"跳过无效文件名: {filename}")
-
-            if not time_seconds:
-                raise ValueError("没有有效的文件名时间数据")
-            
-            # 计算时间差并生成时间轴
-            base_time = datetime.strptime("00:00:00.000", "%H:%M:%S.%f")
-            time_diff = [ts - time_seconds[0] for ts in time_seconds]
-            cumulative_time = [base_time + timedelta(seconds=(td / speed_factor)) 
-                              for td in time_diff]
-
-        else:
-            raise ValueError(f"不支持的首列类型: {first_column}")
-
-        # 过滤有效数据
-        valid_data = data.iloc[valid_indices].reset_index(drop=True)
-        epsilon = valid_data['ε (%)']
-        sigma = valid_data['σ (MPa)']
-
-        # 数据平滑处理
-        window_length = min(37, len(epsilon))
-        polyorder = 2
-        smoothed_epsilon = savgol_filter(epsilon, window_length, polyorder)
-        smoothed_sigma = savgol_filter(sigma, window_length, polyorder)
+        time_axis, smoothed_epsilon, smoothed_sigma, output_file_path = smooth_stress_strain(
+            input_file_path, sheet_name, speed_factor, output_file_path=smoothed_file_path)
 
         # 确保输出目录存在
         output_dir = os.path.dirname(output_video_path)
-        if not os.path.exists(output_dir):
+        if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # 将平滑后的数据添加到新的Excel工作表
-        output_file_path = input_file_path.replace('.xlsx', '_smoothed.xlsx')
-        output_file_dir = os.path.dirname(output_file_path)
-        if not os.path.exists(output_file_dir):
-            os.makedirs(output_file_dir)
-
-        with pd.ExcelWriter(output_file_path, engine='openpyxl', mode='w') as writer:
-            smoothed_data = pd.DataFrame({'Smoothed ε (%)': smoothed_epsilon, 'Smoothed σ (MPa)': smoothed_sigma})
-            smoothed_data.to_excel(writer, sheet_name='Smoothed_Data', index=False)
-
-        # 创建视频文件
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
+        # 创建视频文件，codec 为 FourCC 时用 OpenCV 编码，为 x264/x265/ffv1 时通过 ffmpeg 管道编码
         fps = 24
         frame_width = 640
         frame_height = 480
-        out = cv2.VideoWriter(output_video_path, fourcc, fps, (frame_width, frame_height))
+        out = open_writer(output_video_path, fps, (frame_width, frame_height), codec, **(encoder_options or {}))
 
-        plt.figure(figsize=(8, 6))
+        try:
+            # 设置坐标轴范围
+            if xlim is None:
+                xlim = (min(smoothed_epsilon), max(smoothed_epsilon))
+            if ylim is None:
+                ylim = (min(smoothed_sigma), max(smoothed_sigma))
 
-        for i in range(len(smoothed_epsilon)):
-            plt.clf()
-            plt.scatter(smoothed_epsilon[:i], smoothed_sigma[:i], color='blue', marker='o', label='Previous Points')
-            plt.scatter(smoothed_epsilon[i], smoothed_sigma[i], color='red', marker='o', s=100, label='Current Point')
+            # #输出平滑的load-displacement曲线
+            # renderer = StressStrainRenderer(xlim, ylim, (frame_width, frame_height), xlabel='Displacement (nm)',
+            #                                 ylabel='Load (uN)', title='load-displacement Curve (Smoothed)')
 
-            # 设置坐标轴范围
-            if xlim is not None:
-                plt.xlim(xlim)
-            else:
-                plt.xlim(min(smoothed_epsilon), max(smoothed_epsilon))
+            # 常驻画布增量绘制，像素直接从 Agg 缓冲区写入视频
+            renderer = StressStrainRenderer(xlim, ylim, (frame_width, frame_height))
 
-            if ylim is not None:
-                plt.ylim(ylim)
+            # 虚拟时间轴：按加速后的时间计算每帧对应的数据点，不再用 sleep 控制节奏
+            if timeline:
+                frame_indices = time_axis.frame_indices(fps)
             else:
-                plt.ylim(min(smoothed_sigma), max(smoothed_sigma))
-
-            # #输出平滑的load-displacement曲线
-            # plt.xlabel('Displacement (nm)')
-            # plt.ylabel('Load (uN)')
-            # plt.title('load-displacement Curve (Smoothed)')
-
-            plt.xlabel('ε (%)')
-            plt.ylabel('σ (MPa)')
-            plt.title('Stress-Strain Curve (Smoothed)')
-            plt.grid()
-            plt.legend()
-
-            # 保存图形为图像
-            plt.savefig('temp_frame.png', bbox_inches='tight')
-            frame = cv2.imread('temp_frame.png')
-            if frame is not None:
-                frame = cv2.resize(frame, (frame_width, frame_height))
+                frame_indices = range(len(smoothed_epsilon))
+
+            # 按帧时间轴精简轨迹点（'minmax' 或 'lttb'），保留峰值和载荷下降，渲染开销只与帧数有关；
+            # timeline=False 时每行一帧，没有可精简的点
+            points_epsilon = np.asarray(smoothed_epsilon)
+            points_sigma = np.asarray(smoothed_sigma)
+            if decimate is not None:
+                kept, frame_indices = decimate_to_frames(frame_indices, points_epsilon, points_sigma, decimate)
+                points_epsilon, points_sigma = points_epsilon[kept], points_sigma[kept]
+                print(f"轨迹点由 {len(smoothed_epsilon)} 个精简为 {len(kept)} 个")
+
+            drawn = 0
+            for index in frame_indices:
+                # 重复的帧直接复用上一帧画面，跳过的数据点一并并入历史轨迹
+                if index >= drawn:
+                    renderer.add_points(points_epsilon[drawn:index + 1], points_sigma[drawn:index + 1])
+                    drawn = index + 1
+                    frame = renderer.frame()
                 out.write(frame)
+        finally:
+            out.release()
 
-            # 控制每帧的显示时间，使用加速后的时间
-            if i < len(cumulative_time) - 1:
-                next_time = cumulative_time[i + 1]
-                current_time = cumulative_time[i]
-                wait_time = (next_time - current_time).total_seconds()
-                time.sleep(max(0, wait_time))
-
-        out.release()
-        os.remove('temp_frame.png')
+        get_recorder().count('frames_written', len(frame_indices))
         print(f"视频已保存为 {output_video_path}，平滑数据已保存至 {output_file_path}")
 
     except Exception as e:
-        print(f"发生错误: {e}")
+        # 记录异常及 traceback 后继续抛出，调用方（批处理、命令行）据此判断失败
+        get_recorder().error('create_stress_strain_video', e)
+        raise
+
+@instrumented
+def create_stress_strain_video_streaming(input_file_path, output_video_path, xlim, ylim, sheet_name='input_data', speed_factor=50,
+                                         timeline=False, chunksize=100000, window_length=37, polyorder=2, codec='XVID', encoder_options=None):
+    """分块读取、流式平滑并逐帧渲染，内存占用与数据总量无关
+
+    结果与 create_stress_strain_video 相同。数据不会整表载入内存，因此必须给定坐标轴范围 xlim、ylim。
+    """
+    output_dir = os.path.dirname(output_video_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    stem, ext = os.path.splitext(input_file_path)
+    smoothed_table = TableAppender(f"{stem}_smoothed{ext}", sheet_name='Smoothed_Data')
+
+    fps = 24
+    frame_width = 640
+    frame_height = 480
+    out = open_writer(output_video_path, fps, (frame_width, frame_height), codec, **(encoder_options or {}))
+    renderer = StressStrainRenderer(xlim, ylim, (frame_width, frame_height))
+
+    epsilon_smoother = StreamingSavgol(window_length, polyorder)
+    sigma_smoother = StreamingSavgol(window_length, polyorder)
+    clock = FrameClock(fps) if timeline else None
+    time_axis = None
+
+    # 已平滑但尚未绘制的数据点从序号 drawn 开始；待写帧按数据序号排队
+    pending_epsilon = np.empty(0)
+    pending_sigma = np.empty(0)
+    pending_frames = np.empty(0, dtype=np.intp)
+    drawn = 0
+    frame = None
+
+    def render_ready(new_epsilon, new_sigma, new_frames):
+        nonlocal pending_epsilon, pending_sigma, pending_frames, drawn, frame
+        smoothed_table.write(pd.DataFrame({'Smoothed ε (%)': new_epsilon, 'Smoothed σ (MPa)': new_sigma}))
+        pending_epsilon = np.concatenate((pending_epsilon, new_epsilon))
+        pending_sigma = np.concatenate((pending_sigma, new_sigma))
+        pending_frames = np.concatenate((pending_frames, new_frames))
+
+        # 只渲染平滑值已经确定的帧
+        available = drawn + pending_epsilon.size
+        ready = np.searchsorted(pending_frames, available)
+        for index in pending_frames[:ready]:
+            if index >= drawn:
+                renderer.add_points(pending_epsilon[:index + 1 - drawn], pending_sigma[:index + 1 - drawn])
+                pending_epsilon = pending_epsilon[index + 1 - drawn:]
+                pending_sigma = pending_sigma[index + 1 - drawn:]
+                drawn = index + 1
+                frame = renderer.frame()
+            out.write(frame)
+        get_recorder().count('frames_written', ready)
+        pending_frames = pending_frames[ready:]
+
+    try:
+        for chunk in iter_table_chunks(input_file_path, sheet_name, chunksize=chunksize):
+            if time_axis is None:
+                time_axis = StreamingTimeAxis(chunk.columns[0], speed_factor)
+            offset = time_axis.count
+            axis = time_axis.push(chunk[chunk.columns[0]])
+
+            epsilon = chunk['ε (%)'].to_numpy(dtype=float)[axis.valid_indices]
+            sigma = chunk['σ (MPa)'].to_numpy(dtype=float)[axis.valid_indices]
+            if clock is not None:
+                new_frames = clock.push(axis.seconds, offset)
+            else:
+                new_frames = np.arange(offset, offset + len(axis))
+            render_ready(epsilon_smoother.push(epsilon), sigma_smoother.push(sigma), new_frames)
+
+        if time_axis is None or time_axis.count == 0:
+            raise ValueError("没有有效的时间数据")
+        last_frames = clock.finish(time_axis.count) if clock is not None else np.empty(0, dtype=np.intp)
+        render_ready(epsilon_smoother.finish(), sigma_smoother.finish(), last_frames)
+    finally:
+        out.release()
+        output_file_path = smoothed_table.close()
+
+    print(f"视频已保存为 {output_video_path}，平滑数据已保存至 {output_file_path}")
 
 if __name__ == "__main__":
     # 设置路径
@@ -179,4 +206,7 @@ if __name__ == "__main__":
     ylim = (0, 300)  # 设置纵轴范围
 
     # 创建应力-应变视频，speed_factor 可根据需要调整
+    # 数据量很大（如多 GB 的 CSV/Parquet 采集日志）时可改用 create_stress_strain_video_streaming 分块处理
+    # timeline=True 时按加速后的实验时间重复/丢弃帧，使视频时长与实验时钟一致；
+    # 高采样率数据可同时设置 decimate='minmax'（或 'lttb'）精简每帧之间的轨迹点
     create_stress_strain_video(input_file_path, output_stress_strain_video_path, speed_factor=50, xlim=xlim, ylim=ylim)
\ No newline at end of file
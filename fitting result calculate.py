@@ -1,56 +1,66 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from numpy.polynomial import Polynomial
-
-# 定义多项式阶数
-degree = 9  # 可以根据需要调整阶数
-
-# 读取 Excel 文件
-input_file = r'e:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\fitting_calculation.xlsx'  # 请替换为你的 Excel 文件名
-
-# 加载数据
-df = pd.read_excel(input_file, sheet_name=None)
-
-# 提取 fitting data
-fitting_data = df['fitting data']
-x_fit = fitting_data['x'].values
-y_fit = fitting_data['y'].values
-
-# 多项式拟合
-p = Polynomial.fit(x_fit, y_fit, degree)
-
-# 提取 calculation data
-calculation_data = df['calculation data']
-x_calc = calculation_data['x'].values
-
-# 计算拟合结果
-y_calc = p(x_calc)
-
-# 将结果添加到数据框的 y 列
-calculation_data['y'] = y_calc
-
-# 保存结果到原始 Excel 文件
-with pd.ExcelWriter(input_file, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-    calculation_data.to_excel(writer, sheet_name='calculation data', index=False)
-
-# 可视化结果
-plt.figure(figsize=(10, 6))
-# 绘制原始数据点
-plt.scatter(x_fit, y_fit, color='red', label='Fitting Data', s=50)
-# 绘制拟合曲线
-x_fit_line = np.linspace(min(x_fit), max(x_fit), 100)
-y_fit_line = p(x_fit_line)
-plt.plot(x_fit_line, y_fit_line, color='blue', label='Polynomial Fit', linewidth=2)
-# 绘制计算结果
-plt.scatter(x_calc, y_calc, color='green', label='Calculated Data', s=50)
-plt.title('Polynomial Fit and Calculation Results')
-plt.xlabel('x')
-plt.ylabel('y')
-plt.legend()
-plt.grid()
-plt.savefig('fitting_results.png')  # 保存图像
-plt.show()  # 显示图像
-
-print(f"Results saved to {input_file} in 'calculation data' sheet.")
+from insitu.fitting import fit, evaluate, save_model
+from insitu.tableio import read_table, write_table
 
+def fit_and_calculate(input_file, degree=9, kind='poly', figure_path='fitting_results.png', model_path=None, cache_dir=None, show=True):
+    """用 fitting data 工作表的数据拟合，计算 calculation data 工作表的 y 并写回原文件，返回拟合模型
+
+    kind='poly' 时 degree 可为整数，或 'aic'/'cv' 自动选择阶数；kind='spline' 为平滑样条，kind='monotone' 为单调拟合。
+    给定 model_path 时保存模型，给定 cache_dir 时相同数据和参数不再重新拟合。
+    """
+    # 提取 fitting data
+    fitting_data = read_table(input_file, sheet_name='fitting data')
+    x_fit = fitting_data['x'].values
+    y_fit = fitting_data['y'].values
+
+    # 拟合
+    params = {'degree': degree} if kind == 'poly' else {}
+    model = fit(x_fit, y_fit, kind, cache_dir, **params)
+    if kind == 'poly':
+        print(f"多项式阶数: {int(model.degree[0])}")
+    if model_path is not None:
+        save_model(model, model_path)
+
+    # 提取 calculation data，分块计算拟合结果
+    calculation_data = read_table(input_file, sheet_name='calculation data')
+    x_calc = calculation_data['x'].values
+    y_calc = evaluate(model, x_calc)
+
+    # 将结果添加到数据框的 y 列
+    calculation_data['y'] = y_calc
+
+    # 保存结果到原始文件，Excel 只替换 calculation data 工作表
+    write_table(calculation_data, input_file, sheet_name='calculation data', replace_sheet=True)
+
+    # 可视化结果
+    plt.figure(figsize=(10, 6))
+    # 绘制原始数据点
+    plt.scatter(x_fit, y_fit, color='red', label='Fitting Data', s=50)
+    # 绘制拟合曲线
+    x_fit_line = np.linspace(min(x_fit), max(x_fit), 100)
+    y_fit_line = model(x_fit_line)
+    plt.plot(x_fit_line, y_fit_line, color='blue', label='Polynomial Fit' if kind == 'poly' else 'Fit', linewidth=2)
+    # 绘制计算结果
+    plt.scatter(x_calc, y_calc, color='green', label='Calculated Data', s=50)
+    plt.title('Polynomial Fit and Calculation Results')
+    plt.xlabel('x')
+    plt.ylabel('y')
+    plt.legend()
+    plt.grid()
+    plt.savefig(figure_path)  # 保存图像
+    if show:
+        plt.show()  # 显示图像
+    plt.close()
+
+    print(f"Results saved to {input_file} in 'calculation data' sheet.")
+    return model
+
+if __name__ == "__main__":
+    # 读取数据文件，格式由扩展名决定（Excel 按工作表读取，Parquet/Feather/CSV 读取 <名称>_<工作表> 文件）
+    input_file = r'e:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\fitting_calculation.xlsx'  # 请替换为你的 Excel 文件名
+
+    # 定义多项式阶数，可以根据需要调整；设为 'aic' 或 'cv' 时自动选择
+    degree = 9
+
+    fit_and_calculate(input_file, degree)
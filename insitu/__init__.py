@@ -0,0 +1 @@
+"""原位 TEM 力学实验视频处理的公共组件"""
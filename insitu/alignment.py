@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class FrameAlignment:
+    """每个视频帧对应的数据点
+
+    indices 为整数序号（无对应数据时为 -1），positions 为按时间线性插值的小数序号，
+    offsets 为帧时刻与所选数据点时刻之差（秒）。
+    """
+
+    def __init__(self, indices, positions, offsets):
+        self.indices = indices
+        self.positions = positions
+        self.offsets = offsets
+
+    def __len__(self):
+        return self.indices.size
+
+    def interpolate(self, values):
+        """按 positions 对数据列做线性插值，得到每帧对应的数值"""
+        values = np.asarray(values, dtype=float)
+        result = np.interp(self.positions, np.arange(values.size), values)
+        result[self.indices < 0] = np.nan
+        return result
+
+
+def align_frames(frame_seconds, data_seconds, method='nearest', tolerance=None):
+    """按时间戳把视频帧对齐到数据点，全部为向量化的 searchsorted
+
+    frame_seconds、data_seconds 为同一时钟下的秒数。method 为 'nearest'（最近的数据点）
+    或 'previous'（不晚于帧时刻的最后一个数据点）。与所选数据点相差超过 tolerance 秒的帧、
+    以及时间戳为 NaN 的帧记为 -1。
+    """
+    frame_seconds = np.asarray(frame_seconds, dtype=float)
+    data_seconds = np.maximum.accumulate(np.asarray(data_seconds, dtype=float))
+    if data_seconds.size == 0:
+        empty = np.full(frame_seconds.size, -1, dtype=np.intp)
+        return FrameAlignment(empty, np.full(frame_seconds.size, np.nan), np.full(frame_seconds.size, np.nan))
+
+    after = np.searchsorted(data_seconds, frame_seconds, side='right')
+    previous = after - 1
+    if method == 'previous':
+        indices = previous
+    elif method == 'nearest':
+        following = np.minimum(after, data_seconds.size - 1)
+        clipped = np.maximum(previous, 0)
+        use_following = (previous < 0) | (
+            np.abs(data_seconds[following] - frame_seconds) < np.abs(frame_seconds - data_seconds[clipped]))
+        indices = np.where(use_following, following, clipped)
+    else:
+        raise ValueError(f"不支持的对齐方式: {method}")
+
+    valid = (indices >= 0) & ~np.isnan(frame_seconds)
+    offsets = np.full(frame_seconds.size, np.nan)
+    offsets[valid] = frame_seconds[valid] - data_seconds[indices[valid]]
+    if tolerance is not None:
+        valid &= np.abs(offsets) <= tolerance
+    indices = np.where(valid, indices, -1)
+
+    positions = np.interp(frame_seconds, data_seconds, np.arange(data_seconds.size, dtype=float))
+    positions[~valid] = np.nan
+    return FrameAlignment(indices, positions, offsets)
@@ -0,0 +1,247 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from insitu.cache import StageCache
+from insitu.compositor import concatenate_videos, overlay_aligned_data
+from insitu.framegraph import frame_list_path
+from insitu.instrument import get_recorder
+from insitu.scripts import load_script
+
+STATE_NAME = 'batch_state.json'
+LOG_NAME = 'batch.log'
+
+SESSION_DEFAULTS = {
+    'sheet_name': 'input_data',
+    'speed_factor': 50,
+    'frame_rate': 24,
+    'codec': 'XVID',
+    'crop_area': None,
+    'xlim': None,
+    'ylim': None,
+    'overlay_scale': 0.25,
+    'overlay_margin': 10,
+    'merge_codec': 'x264',
+    'encoder_options': None,
+    'decimate': None,
+    'timeline': False,
+}
+
+
+def load_manifest(path):
+    """读取批处理清单（JSON），返回补全默认值后的会话列表
+
+    格式：{"sessions": [{"name": ..., "image_folder": ..., "log_workbook": ..., "output_dir": ...,
+    "sync_images": [开始图像, 结束图像], "crop_area": [x, y, w, h], "xlim": [...], "ylim": [...],
+    "speed_factor": 50, "frame_rate": 24, "codec": "XVID", "sheet_name": "input_data",
+    "overlay_scale": 0.25, "overlay_margin": 10, "merge_codec": "x264",
+    "encoder_options": {"preset": "veryfast", "crf": 20, "threads": 8}, "decimate": "minmax", "timeline": false}, ...]}
+    codec 用于图像视频和应力视频，merge_codec 用于合成视频，可为 FourCC 或 x264/x265/ffv1。
+    decimate 为 'minmax' 或 'lttb' 时按帧精简叠加小图的轨迹点。
+    timeline 为 true 时应力视频按 speed_factor 加速后的实验时间取帧，否则每行数据一帧。
+    相对路径相对于清单文件所在目录。
+    """
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    sessions = []
+    for entry in manifest['sessions']:
+        session = dict(SESSION_DEFAULTS, **entry)
+        for key in ('image_folder', 'log_workbook', 'output_dir'):
+            session[key] = os.path.join(base_dir, session[key])
+        session.setdefault('name', os.path.basename(os.path.normpath(session['output_dir'])))
+        sessions.append(session)
+    return sessions
+
+
+def fingerprint(inputs, params):
+    """由输入文件/文件夹的大小和修改时间以及参数计算指纹，任一变化即视为过期"""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    for path in inputs:
+        digest.update(path.encode('utf-8'))
+        if os.path.isdir(path):
+            # 忽略隐藏文件（如图像文件夹索引 .image_index.json）
+            with os.scandir(path) as entries:
+                stats = sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                               for entry in entries if entry.is_file() and not entry.name.startswith('.'))
+            digest.update(json.dumps(stats).encode('utf-8'))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+        else:
+            digest.update(b'missing')
+    return digest.hexdigest()
+
+
+def session_stages(session, workers=None):
+    """返回会话的各处理阶段：(名称, 输入, 参数, 输出, 执行函数)"""
+    out = session['output_dir']
+    image_folder = session['image_folder']
+    log_workbook = session['log_workbook']
+    start_image, end_image = session['sync_images']
+
+    timestamps_path = os.path.join(out, 'video_timestamps.xlsx')
+    stress_video = os.path.join(out, 'stress_strain_video.avi')
+    # 平滑数据表写在会话目录中（与日志同格式），不改动输入文件夹
+    smoothed_table = os.path.join(out, 'stress_strain_smoothed' + os.path.splitext(log_workbook)[1])
+    with_name = os.path.join(out, 'output_video_cropped_with_name.avi')
+    without_name = os.path.join(out, 'output_video_cropped_without_name.avi')
+    # 带名称视频的帧列表，记录每帧对应的图像（读取失败的图像被跳过，不占帧序号）
+    with_name_frames = frame_list_path(with_name)
+    part1 = os.path.join(out, 'output_video_part1.avi')
+    part2 = os.path.join(out, 'output_video_part2.avi')
+    merged_part = os.path.join(out, 'merged_video_part.avi')
+    final_video = os.path.join(out, 'final_merged_video.avi')
+
+    def run_timestamps():
+        load_script('timestamps').export_video_timestamps(image_folder, timestamps_path)
+
+    def run_animate():
+        load_script('animate').create_stress_strain_video(
+            log_workbook, stress_video, session['sheet_name'], session['speed_factor'], session['xlim'], session['ylim'],
+            session['timeline'], codec=session['codec'], encoder_options=session['encoder_options'],
+            smoothed_file_path=smoothed_table)
+
+    def run_image_video():
+        load_script('image_video').create_video_from_images(
+            image_folder, with_name, without_name, session['frame_rate'], session['codec'], session['crop_area'], workers,
+            start_image, part1, part2, session['encoder_options'])
+
+    def run_overlay():
+        merge = load_script('merge')
+        frame_names = merge.get_video_frame_names(with_name, image_folder)
+        if start_image not in frame_names or end_image not in frame_names:
+            raise RuntimeError(f"视频中没有同步图像 {start_image} 或 {end_image}")
+        data_indices, smoothed_epsilon, smoothed_sigma = merge.align_data_to_frames(
+            image_folder, frame_names.index(start_image), log_workbook, session['sheet_name'],
+            end_frame=frame_names.index(end_image), frame_names=frame_names)
+        overlay_aligned_data(part2, merged_part, data_indices, smoothed_epsilon, smoothed_sigma, session['xlim'], session['ylim'],
+                             session['overlay_scale'], session['overlay_margin'], codec=session['merge_codec'],
+                             encoder_options=session['encoder_options'], decimate=session['decimate'])
+
+    def run_concat():
+        concatenate_videos(part1, merged_part, final_video, codec=session['merge_codec'],
+                           encoder_options=session['encoder_options'])
+
+    animate_params = {key: session[key] for key in ('sheet_name', 'xlim', 'ylim', 'timeline', 'codec', 'encoder_options')}
+    if session['timeline']:
+        # speed_factor 只在按时间轴取帧时影响应力视频
+        animate_params['speed_factor'] = session['speed_factor']
+    image_params = {key: session[key] for key in ('frame_rate', 'codec', 'crop_area', 'encoder_options')}
+    image_params['split_image'] = start_image
+    overlay_params = {key: session[key] for key in ('sheet_name', 'xlim', 'ylim', 'overlay_scale', 'overlay_margin',
+                                                    'merge_codec', 'encoder_options', 'decimate')}
+    overlay_params['sync_images'] = [start_image, end_image]
+    concat_params = {key: session[key] for key in ('merge_codec', 'encoder_options')}
+
+    return [
+        ('timestamps', [image_folder], {}, [timestamps_path], run_timestamps),
+        ('animate', [log_workbook], animate_params, [stress_video, smoothed_table], run_animate),
+        ('image_video', [image_folder], image_params, [with_name, without_name, part1, part2, with_name_frames],
+         run_image_video),
+        ('overlay', [image_folder, log_workbook, part2, with_name_frames], overlay_params, [merged_part], run_overlay),
+        ('concat', [part1, merged_part], concat_params, [final_video], run_concat),
+    ]
+
+
+def run_session(session, force=False, workers=None, cache_dir=None, cache_budget_gb=50):
+    """在当前进程中依次执行会话的各阶段，已是最新的阶段跳过，返回 (名称, 是否成功, 说明)
+
+    各阶段成功后才记录指纹，失败后重新运行会从失败的阶段继续。输出写入会话目录下的 batch.log。
+    给定 cache_dir 时，过期的阶段先按输入内容和参数查找共享的阶段缓存，命中则直接复制产物，
+    例如只修改叠加位置时只重新运行 overlay 和 concat 两个阶段。
+    """
+    out = session['output_dir']
+    os.makedirs(out, exist_ok=True)
+    state_path = os.path.join(out, STATE_NAME)
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    cache = StageCache(cache_dir, int(cache_budget_gb * 2**30)) if cache_dir else None
+    recorder = get_recorder()
+
+    with open(os.path.join(out, LOG_NAME), 'a', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        print(f"===== {time.strftime('%Y-%m-%d %H:%M:%S')} 会话 {session['name']} =====")
+        for name, inputs, params, outputs, run in session_stages(session, workers):
+            stage_fingerprint = fingerprint(inputs, params)
+            if not force and state.get(name) == stage_fingerprint and all(map(os.path.exists, outputs)):
+                print(f"[{name}] 已是最新，跳过")
+                recorder.emit('stage_skipped', stage=name, session=session['name'])
+                continue
+
+            print(f"[{name}] 开始")
+            start = time.perf_counter()
+            try:
+                # 先删除上次的输出：阶段失败时不会留下旧文件被当作本次的结果记录指纹或存入缓存
+                for path in outputs:
+                    if os.path.exists(path):
+                        os.remove(path)
+                with recorder.stage(name, session=session['name']):
+                    if cache is not None and not force:
+                        cache.run(name, inputs, params, outputs, run)
+                    else:
+                        run()
+                        # 阶段函数出错时应抛出异常；再检查一次输出文件，防止未写出任何文件却正常返回
+                        missing = [path for path in outputs if not os.path.exists(path)]
+                        if missing:
+                            raise RuntimeError(f"未生成输出文件: {', '.join(missing)}")
+            except Exception as e:
+                recorder.error(name, e)
+                traceback.print_exc()
+                if cache is not None:
+                    cache.close()
+                return session['name'], False, f"{name} 阶段失败: {e}"
+
+            state[name] = stage_fingerprint
+            with open(state_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            print(f"[{name}] 完成，用时 {time.perf_counter() - start:.1f} s")
+
+    if cache is not None:
+        cache.close()
+    return session['name'], True, "完成"
+
+
+def run_batch(sessions, jobs=None, force=False, workers=None, cache_dir=None, cache_budget_gb=50):
+    """用进程池并行处理多个会话，单个会话失败不影响其他会话，返回各会话的结果"""
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_session, session, force, workers, cache_dir, cache_budget_gb): session['name']
+                   for session in sessions}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = (futures[future], False, f"进程异常: {e}")
+            results.append(result)
+            print(f"{result[0]}: {'成功' if result[1] else '失败'} - {result[2]}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按清单批量处理原位实验会话")
+    parser.add_argument('manifest', help="会话清单 JSON 文件")
+    parser.add_argument('--jobs', type=int, default=None, help="并行会话数，默认等于 CPU 核心数")
+    parser.add_argument('--workers', type=int, default=1, help="每个会话图像解码的线程数")
+    parser.add_argument('--force', action='store_true', help="忽略指纹和缓存，全部重新处理")
+    parser.add_argument('--cache-dir', default=None, help="阶段缓存目录，多个会话和多次运行共享")
+    parser.add_argument('--cache-budget', type=float, default=50, help="阶段缓存的磁盘预算（GB），超出时淘汰最久未用的条目")
+    parser.add_argument('--trace', default=None, help="性能记录（JSON lines）输出文件，见 insitu.instrument")
+    args = parser.parse_args()
+    if args.trace:
+        # 子进程从环境变量创建各自的记录器，追加写入同一文件
+        os.environ['INSITU_TRACE'] = os.path.abspath(args.trace)
+
+    results = run_batch(load_manifest(args.manifest), args.jobs, args.force, args.workers, args.cache_dir, args.cache_budget)
+    failed = [name for name, ok, _ in results if not ok]
+    if failed:
+        raise SystemExit(f"{len(failed)} 个会话失败: {', '.join(failed)}")
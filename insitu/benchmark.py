@@ -0,0 +1,280 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def generate_session(output_dir, frame_count=300, resolution=(1024, 1024), row_count=20000, fps=25, seed=0,
+                     invalid_fraction=0.01, start='16:15:26'):
+    """生成合成的原位实验会话：图像文件夹和力学数据表，返回会话信息（字典）
+
+    图像命名为 image-HHMMSS_mmm.jpg，帧间隔在 1/fps 附近抖动；数据表 input_data.xlsx 的
+    raw 工作表为绝对时刻（供 calculate_time_differences 使用），input_data 工作表为逐行时长、
+    ε (%) 和 σ (MPa)。两张工作表都按 invalid_fraction 混入无法解析的时间行。
+    """
+    import cv2
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    width, height = resolution
+    image_folder = os.path.join(output_dir, 'images')
+    os.makedirs(image_folder, exist_ok=True)
+    hours, minutes, seconds = (int(part) for part in start.split(':'))
+    start_seconds = hours * 3600 + minutes * 60 + seconds
+
+    # 图像：平滑背景上叠加噪声和随帧移动的亮斑，接近 TEM 图像的 JPEG 压缩率
+    frame_times = start_seconds + np.cumsum(np.r_[0, rng.uniform(0.8, 1.2, frame_count - 1) / fps])
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    background = (96 + 48 * np.sin(xx / 37) * np.cos(yy / 53)).astype(np.float32)
+    names = []
+    for i, t in enumerate(frame_times):
+        ms = int(round(t * 1000))
+        name = f"image-{ms // 3600000:02d}{ms // 60000 % 60:02d}{ms // 1000 % 60:02d}_{ms % 1000:03d}.jpg"
+        cx, cy = width * (0.3 + 0.4 * i / frame_count), height / 2
+        spot = 80 * np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * (width / 20) ** 2))
+        noise = rng.normal(0, 8, (height, width)).astype(np.float32)
+        gray = np.clip(background + spot + noise, 0, 255).astype(np.uint8)
+        cv2.imwrite(os.path.join(image_folder, name), cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        names.append(name)
+
+    # 力学数据：弹性段 + 加工硬化 + 若干次载荷下降，带测量噪声
+    intervals = rng.uniform(0.8, 1.2, row_count) * (frame_times[-1] - frame_times[0]) / row_count
+    strain = np.linspace(0, 10, row_count)
+    stress = np.minimum(strain * 120, 150 + 60 * np.sqrt(np.maximum(strain - 1.25, 0)))
+    for drop in rng.uniform(2, 9, 3):
+        stress -= 25 * np.exp(-((strain - drop) / 0.05) ** 2)
+    stress += rng.normal(0, 2, row_count)
+    strain += rng.normal(0, 0.01, row_count)
+
+    def format_time(values, clock):
+        ms = np.round(values * 1000).astype(np.int64)
+        hh = ms // 3600000 if clock else ms * 0
+        return [f"{h:02d}:{m:02d}:{s:02d} {f:03d}" for h, m, s, f in zip(hh, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)]
+
+    interval_text = format_time(intervals, clock=False)
+    clock_text = format_time(start_seconds + np.cumsum(intervals), clock=True)
+    for text in (interval_text, clock_text):
+        for row in rng.choice(row_count, int(row_count * invalid_fraction), replace=False):
+            text[row] = rng.choice(['', '--', 'N/A'])
+
+    workbook = os.path.join(output_dir, 'input_data.xlsx')
+    with pd.ExcelWriter(workbook) as writer:
+        pd.DataFrame({'Time(Sec)': interval_text, 'ε (%)': strain, 'σ (MPa)': stress}).to_excel(
+            writer, sheet_name='input_data', index=False)
+        pd.DataFrame({'Time(Sec)': clock_text, 'Load (uN)': stress, 'Displacement (nm)': strain * 100}).to_excel(
+            writer, sheet_name='raw', index=False)
+
+    return {
+        'output_dir': output_dir,
+        'image_folder': image_folder,
+        'workbook': workbook,
+        'frame_count': frame_count,
+        'row_count': row_count,
+        'resolution': [width, height],
+        'split_image': names[frame_count // 3],
+        'split_frame': frame_count // 3,
+        'xlim': [float(np.floor(strain.min())), float(np.ceil(strain.max()))],
+        'ylim': [0.0, float(np.ceil(stress.max() / 50) * 50)],
+    }
+
+
+def _peak_rss():
+    """当前进程的峰值常驻内存（字节），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _video_frame_count(path):
+    """视频容器中记录的帧数"""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def _stage_calls(session, codec):
+    """各阶段：(名称, 计量单位, 数量, 执行函数)，按依赖顺序排列
+
+    数量为可调用对象时在阶段完成后求值（如按实际写出的帧数计）；为 None 时只计时，不计算吞吐量。
+    """
+    from insitu.scripts import load_script
+
+    out = session['output_dir']
+    paths = {name: os.path.join(out, name) for name in (
+        'time_differences.xlsx', 'video_timestamps.xlsx', 'stress_strain_video.avi', 'with_name.avi', 'without_name.avi',
+        'part1.avi', 'part2.avi', 'adjusted_stress_video.avi', 'overlay.avi', 'overlay_aligned.avi', 'final.avi')}
+    frames = session['frame_count']
+    part2_frames = frames - session['split_frame']
+
+    def time_differences():
+        load_script('time_differences').calculate_time_differences(session['workbook'], paths['time_differences.xlsx'])
+
+    def timestamps():
+        load_script('timestamps').export_video_timestamps(session['image_folder'], paths['video_timestamps.xlsx'])
+
+    def animate():
+        load_script('animate').create_stress_strain_video(session['workbook'], paths['stress_strain_video.avi'],
+                                                          xlim=session['xlim'], ylim=session['ylim'])
+
+    def image_video():
+        crop = session['resolution'][0] // 8, session['resolution'][1] // 8, *(v * 3 // 4 for v in session['resolution'])
+        load_script('image_video').create_video_from_images(
+            session['image_folder'], paths['with_name.avi'], paths['without_name.avi'], 24, 'XVID', crop)
+
+    def split():
+        load_script('merge').split_video_at_frame(paths['with_name.avi'], session['split_frame'],
+                                                  paths['part1.avi'], paths['part2.avi'])
+
+    def adjust_speed():
+        merge = load_script('merge')
+        new_fps = merge.get_frame_count(paths['stress_strain_video.avi']) / part2_frames * 24
+        merge.adjust_video_speed(paths['stress_strain_video.avi'], paths['adjusted_stress_video.avi'], new_fps)
+
+    def overlay():
+        from insitu.compositor import overlay_videos
+
+        overlay_videos(paths['part2.avi'], paths['adjusted_stress_video.avi'], paths['overlay.avi'], codec=codec)
+
+    def overlay_aligned():
+        from insitu.compositor import overlay_aligned_data
+
+        merge = load_script('merge')
+        frame_names = merge.get_video_frame_names(paths['with_name.avi'], session['image_folder'])
+        data_indices, epsilon, sigma = merge.align_data_to_frames(session['image_folder'], session['split_frame'],
+                                                                  session['workbook'], frame_names=frame_names)
+        overlay_aligned_data(paths['part2.avi'], paths['overlay_aligned.avi'], data_indices, epsilon, sigma,
+                             session['xlim'], session['ylim'], codec=codec)
+
+    def concatenate():
+        from insitu.compositor import concatenate_videos
+
+        concatenate_videos(paths['part1.avi'], paths['overlay_aligned.avi'], paths['final.avi'], codec=codec)
+
+    rows = session['row_count']
+    return [
+        ('calculate_time_differences', 'rows', rows, time_differences),
+        ('export_video_timestamps', 'frames', frames, timestamps),
+        # 无效时间行被剔除，视频帧数少于数据行数，按实际写出的帧数计
+        ('create_stress_strain_video', 'frames', lambda: _video_frame_count(paths['stress_strain_video.avi']), animate),
+        ('create_video_from_images', 'frames', frames, image_video),
+        ('split_video_at_frame', 'frames', frames, split),
+        # 只改写容器帧率，耗时与帧数无关，按单个文件计时
+        ('adjust_video_speed', 'file', None, adjust_speed),
+        ('overlay_videos', 'frames', part2_frames, overlay),
+        ('overlay_aligned_data', 'frames', part2_frames, overlay_aligned),
+        ('concatenate_videos', 'frames', frames, concatenate),
+    ]
+
+
+def _run_stage(session, codec, name):
+    """在独立进程中执行一个阶段，峰值内存只反映该阶段；脚本输出写入 benchmark.log"""
+    stage = next(stage for stage in _stage_calls(session, codec) if stage[0] == name)
+    log_path = os.path.join(session['output_dir'], 'benchmark.log')
+    with open(log_path, 'a', encoding='utf-8') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        print(f"===== {name} =====")
+        start = time.perf_counter()
+        try:
+            stage[3]()
+            error = None
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - start
+    return seconds, _peak_rss(), error
+
+
+def run_benchmark(session, codec='XVID', stages=None, repeat=1):
+    """依次计时各阶段，每次运行使用新进程，返回结果列表
+
+    每项包含 stage、seconds（多次运行取最短）、throughput（frames/s 或 rows/s，按文件计时的阶段为 None）、
+    peak_rss_bytes 和 error。
+    进度输出到标准错误，标准输出只留给 JSON 报告。
+    """
+    results = []
+    for name, unit, count, _ in _stage_calls(session, codec):
+        if stages is not None and name not in stages:
+            continue
+        best, peak, error = None, None, None
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                seconds, rss, error = pool.submit(_run_stage, session, codec, name).result()
+            if error is not None:
+                break
+            best = seconds if best is None else min(best, seconds)
+            peak = rss if peak is None or rss is None else max(peak, rss)
+
+        if callable(count):
+            count = count() if error is None else None
+        result = {'stage': name, 'unit': unit, 'count': count, 'seconds': best,
+                  'throughput': count / best if best and count is not None else None, 'peak_rss_bytes': peak,
+                  'error': error}
+        results.append(result)
+        if error is not None:
+            print(f"{name}: 失败 - {error}", file=sys.stderr)
+        else:
+            memory = f", peak RSS {peak / 2**20:.0f} MiB" if peak else ""
+            throughput = f", {result['throughput']:.1f} {unit}/s" if result['throughput'] is not None else ""
+            print(f"{name}: {best:.2f} s{throughput}{memory}", file=sys.stderr)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用合成的原位实验会话对各处理阶段计时")
+    parser.add_argument('workdir', help="合成会话及中间文件的目录")
+    parser.add_argument('--frames', type=int, default=300, help="图像数量")
+    parser.add_argument('--resolution', default='1024x1024', help="图像分辨率，宽x高")
+    parser.add_argument('--rows', type=int, default=20000, help="力学数据行数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--codec', default='XVID', help="合成阶段的编码器（FourCC 或 x264/x265/ffv1）")
+    parser.add_argument('--stage', action='append', dest='stages', help="只运行指定阶段，可重复")
+    parser.add_argument('--repeat', type=int, default=1, help="每个阶段运行次数，取最短时间")
+    parser.add_argument('--reuse', action='store_true', help="复用 workdir 中已生成的会话")
+    parser.add_argument('--output', default=None, help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    session_path = os.path.join(args.workdir, 'session.json')
+    if args.reuse and os.path.exists(session_path):
+        with open(session_path, encoding='utf-8') as f:
+            session = json.load(f)
+    else:
+        width, height = (int(v) for v in args.resolution.lower().split('x'))
+        start = time.perf_counter()
+        session = generate_session(args.workdir, args.frames, (width, height), args.rows, seed=args.seed)
+        print(f"合成会话已生成，用时 {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        with open(session_path, 'w', encoding='utf-8') as f:
+            json.dump(session, f, indent=2)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'cpu_count': os.cpu_count(),
+        'session': session,
+        'codec': args.codec,
+        'results': run_benchmark(session, args.codec, args.stages, args.repeat),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"结果已保存至 {args.output}", file=sys.stderr)
+    else:
+        print(text)
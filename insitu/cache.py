@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+
+class StageCache:
+    """按内容寻址的阶段缓存：键由阶段名、参数和输入文件内容的哈希组成
+
+    命中时把缓存的产物复制到输出路径，不再重新计算；缓存总大小超过 budget_bytes 时
+    按最近使用时间淘汰。文件内容哈希按 (路径, 大小, 修改时间) 记忆，未变化的文件不会重复读取。
+    """
+
+    def __init__(self, root, budget_bytes=50 * 2**30):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, 'cache.sqlite'), timeout=60)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS file_hashes '
+                             '(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS entries '
+                             '(key TEXT PRIMARY KEY, stage TEXT, size INTEGER, created REAL, last_used REAL)')
+
+    def file_hash(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self._db.execute('SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?', (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)',
+                             (path, stat.st_size, stat.st_mtime_ns, sha256))
+        return sha256
+
+    def content_hash(self, path):
+        """文件取内容哈希；文件夹取各文件名与内容哈希的组合（忽略隐藏文件）"""
+        if not os.path.isdir(path):
+            return self.file_hash(path)
+        digest = hashlib.sha256()
+        with os.scandir(path) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_file() and not entry.name.startswith('.'))
+        for name in names:
+            digest.update(f'{name}:{self.file_hash(os.path.join(path, name))}\n'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def key(self, stage, inputs, params):
+        payload = {
+            'stage': stage,
+            'params': params,
+            'inputs': [self.content_hash(path) for path in inputs],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, 'objects', key[:2], key)
+
+    def fetch(self, key, outputs):
+        """缓存命中时把产物复制到 outputs 并返回 True"""
+        entry_dir = self._entry_dir(key)
+        cached = [os.path.join(entry_dir, f'{i}_{os.path.basename(path)}') for i, path in enumerate(outputs)]
+        if not all(map(os.path.exists, cached)):
+            return False
+        for source, target in zip(cached, outputs):
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            shutil.copyfile(source, target)
+        with self._db:
+            self._db.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+        return True
+
+    def store(self, key, stage, outputs):
+        """把产物存入缓存；多个进程同时存入同一个键时，先完成改名的一方生效，其余视为已存入"""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        # 每个进程使用独立的暂存目录，复制完成后原子改名为条目目录
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key}.', dir=os.path.dirname(entry_dir))
+        try:
+            size = 0
+            for i, path in enumerate(outputs):
+                target = os.path.join(tmp_dir, f'{i}_{os.path.basename(path)}')
+                shutil.copyfile(path, target)
+                size += os.path.getsize(target)
+            try:
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                # 条目目录已存在且非空：其他进程已存入相同内容
+                if not os.path.isdir(entry_dir):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        now = time.time()
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, stage, size, now, now))
+        self.evict()
+
+    def evict(self):
+        """按最近使用时间淘汰，直到缓存总大小不超过预算"""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY last_used').fetchall():
+            if total <= self.budget_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            with self._db:
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+
+    def run(self, stage, inputs, params, outputs, func):
+        """执行一个阶段：命中缓存时直接复用产物，否则运行 func 并把产物存入缓存，返回是否命中"""
+        key = self.key(stage, inputs, params)
+        if self.fetch(key, outputs):
+            print(f"[{stage}] 命中缓存 {key[:12]}")
+            return True
+        func()
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            raise RuntimeError(f"未生成输出文件: {', '.join(missing)}")
+        self.store(key, stage, outputs)
+        return False
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,175 @@
+import argparse
+import os
+
+from insitu.scripts import load_script
+
+# 本模块只导入标准库和 insitu.scripts：各子命令在执行时才导入对应脚本，
+# 因此 `python -m insitu info` 等轻量查询不会加载 pandas/scipy/matplotlib。
+
+
+def _pair(type_):
+    def parse(value):
+        return tuple(type_(v) for v in value.replace('x', ',').split(','))
+    return parse
+
+
+def _degree(value):
+    return value if value in ('aic', 'cv') else int(value)
+
+
+def _timestamps(args):
+    load_script('timestamps').export_video_timestamps(args.folder, args.output)
+
+
+def _time_diff(args):
+    load_script('time_differences').calculate_time_differences(args.input, args.output, args.sheet)
+
+
+def _smooth(args):
+    script = load_script('animate')
+    _, _, _, output_file_path = script.smooth_stress_strain(args.workbook, args.sheet, args.speed_factor,
+                                                            args.window, args.polyorder)
+    print(f"平滑数据已保存至 {output_file_path}")
+
+
+def _animate(args):
+    if args.streaming and (args.xlim is None or args.ylim is None):
+        raise SystemExit("--streaming 需要同时给定 --xlim 和 --ylim")
+    script = load_script('animate')
+    # 先删除旧的输出视频，失败时不会把上次的结果当作本次的输出
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    if args.streaming:
+        script.create_stress_strain_video_streaming(args.workbook, args.output, args.xlim, args.ylim, args.sheet,
+                                                    args.speed_factor, args.timeline, args.chunksize, codec=args.codec)
+    else:
+        script.create_stress_strain_video(args.workbook, args.output, args.sheet, args.speed_factor, args.xlim, args.ylim,
+                                          args.timeline, args.codec, decimate=args.decimate)
+    if not os.path.exists(args.output):
+        raise SystemExit(1)
+
+
+def _image_video(args):
+    load_script('image_video').create_video_from_images(
+        args.folder, args.with_name, args.without_name, args.fps, args.codec, args.crop, args.workers,
+        args.split_image, args.part1, args.part2, frame_store=args.frame_store, output_size=args.output_size)
+
+
+def _merge(args):
+    workdir = args.workdir or os.path.dirname(os.path.abspath(args.final))
+    ok = load_script('merge').merge_session(
+        args.image_folder, args.video,
+        os.path.join(workdir, 'output_video_part1.avi'),
+        os.path.join(workdir, 'output_video_part2.avi'),
+        os.path.join(workdir, 'merged_video_part.avi'),
+        args.final, args.start_image, args.end_image,
+        input_file_path=args.workbook, xlim=args.xlim, ylim=args.ylim,
+        split_in_image_stage=args.split_in_image_stage, codec=args.codec, decimate=args.decimate)
+    if not ok:
+        raise SystemExit(1)
+
+
+def _fit(args):
+    load_script('fit').fit_and_calculate(args.input, args.degree, args.kind, args.figure, args.model, args.cache_dir,
+                                         show=not args.no_show)
+
+
+def _info(args):
+    script = load_script('merge')
+    print(f"frames: {script.get_frame_count(args.video)}")
+    print(f"fps: {script.get_video_fps(args.video)}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m insitu', description="原位实验数据与视频处理")
+    parser.add_argument('--trace', default=None, help="性能记录（JSON lines）输出文件，见 insitu.instrument")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('timestamps', help="导出图像文件夹的时间戳")
+    p.add_argument('folder')
+    p.add_argument('output', help="输出表格，格式由扩展名决定（.xlsx/.parquet/.feather/.csv）")
+    p.set_defaults(handler=_timestamps)
+
+    p = commands.add_parser('time-diff', help="把 Time(Sec) 时刻列转换为逐行时长")
+    p.add_argument('input')
+    p.add_argument('output')
+    p.add_argument('--sheet', default='raw')
+    p.set_defaults(handler=_time_diff)
+
+    p = commands.add_parser('smooth', help="平滑应力-应变数据并写出 _smoothed 表格")
+    p.add_argument('workbook')
+    p.add_argument('--sheet', default='input_data')
+    p.add_argument('--speed-factor', type=float, default=50)
+    p.add_argument('--window', type=int, default=37, help="Savitzky-Golay 窗口长度")
+    p.add_argument('--polyorder', type=int, default=2)
+    p.set_defaults(handler=_smooth)
+
+    p = commands.add_parser('animate', help="生成应力-应变曲线视频")
+    p.add_argument('workbook')
+    p.add_argument('output')
+    p.add_argument('--sheet', default='input_data')
+    p.add_argument('--speed-factor', type=float, default=50)
+    p.add_argument('--xlim', type=float, nargs=2, default=None)
+    p.add_argument('--ylim', type=float, nargs=2, default=None)
+    p.add_argument('--timeline', action='store_true', help="按加速后的时间轴生成帧")
+    p.add_argument('--decimate', choices=('minmax', 'lttb'), default=None)
+    p.add_argument('--codec', default='XVID', help="FourCC 或 x264/x265/ffv1")
+    p.add_argument('--streaming', action='store_true', help="分块读取并流式渲染，需要 --xlim/--ylim")
+    p.add_argument('--chunksize', type=int, default=100000)
+    p.set_defaults(handler=_animate)
+
+    p = commands.add_parser('image-video', help="把 TEM 图像序列裁剪并编码为视频")
+    p.add_argument('folder')
+    p.add_argument('with_name', help="带文件名标注的输出视频")
+    p.add_argument('without_name', help="不带标注的输出视频")
+    p.add_argument('--fps', type=float, default=24)
+    p.add_argument('--codec', default='XVID', help="FourCC 或 x264/x265/ffv1")
+    p.add_argument('--crop', type=int, nargs=4, default=None, metavar=('X', 'Y', 'W', 'H'))
+    p.add_argument('--workers', type=int, default=None, help="图像解码线程数")
+    p.add_argument('--split-image', default=None, help="同一遍解码中在该图像处拆分出前后两段")
+    p.add_argument('--part1', default=None)
+    p.add_argument('--part2', default=None)
+    p.add_argument('--frame-store', default=None, help="帧存储目录，重复生成时直接复用裁剪帧")
+    p.add_argument('--output-size', type=_pair(int), default=None, help="输出尺寸，如 1024x1024")
+    p.set_defaults(handler=_image_video)
+
+    p = commands.add_parser('merge', help="按时间戳把应力-应变小图叠加到 TEM 视频并拼合")
+    p.add_argument('image_folder')
+    p.add_argument('video', help="image-video 生成的带标注视频")
+    p.add_argument('workbook', help="力学数据表格")
+    p.add_argument('final', help="最终输出视频")
+    p.add_argument('--start-image', required=True)
+    p.add_argument('--end-image', required=True)
+    p.add_argument('--xlim', type=float, nargs=2, required=True)
+    p.add_argument('--ylim', type=float, nargs=2, required=True)
+    p.add_argument('--workdir', default=None, help="中间文件目录，默认与最终视频相同")
+    p.add_argument('--codec', default='x264', help="合成输出的编码器")
+    p.add_argument('--decimate', choices=('minmax', 'lttb'), default=None)
+    p.add_argument('--split-in-image-stage', dest='split_in_image_stage', action='store_const', const=True, default=None,
+                   help="直接使用 image-video --split-image 输出的 workdir/output_video_part1/2.avi；"
+                        "默认按两段的帧列表自动判断")
+    p.add_argument('--resplit', dest='split_in_image_stage', action='store_const', const=False,
+                   help="总是从带标注视频重新拆分")
+    p.set_defaults(handler=_merge)
+
+    p = commands.add_parser('fit', help="拟合 fitting data 并计算 calculation data")
+    p.add_argument('input')
+    p.add_argument('--degree', type=_degree, default=9, help="多项式阶数，或 aic/cv 自动选择")
+    p.add_argument('--kind', choices=('poly', 'spline', 'monotone'), default='poly')
+    p.add_argument('--figure', default='fitting_results.png')
+    p.add_argument('--model', default=None, help="保存拟合模型的 JSON 文件")
+    p.add_argument('--cache-dir', default=None)
+    p.add_argument('--no-show', action='store_true', help="只保存图像，不弹出窗口")
+    p.set_defaults(handler=_fit)
+
+    p = commands.add_parser('info', help="显示视频的帧数和帧率")
+    p.add_argument('video')
+    p.set_defaults(handler=_info)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        os.environ['INSITU_TRACE'] = os.path.abspath(args.trace)
+    args.handler(args)
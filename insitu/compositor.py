@@ -0,0 +1,205 @@
+import cv2
+import numpy as np
+from insitu.decimate import decimate_to_frames
+from insitu.encoder import open_writer
+from insitu.instrument import get_recorder, instrumented
+from insitu.pipeline import ThroughputMeter
+
+
+class _MeteredWriter:
+    """统计写出帧数并节流显示进度的写入器包装"""
+
+    def __init__(self, writer, total=None):
+        self._writer = writer
+        self.meter = ThroughputMeter("Compositing", total)
+
+    def write(self, frame):
+        self._writer.write(frame)
+        self.meter.update()
+
+    def release(self):
+        self._writer.release()
+        get_recorder().count('frames_written', self.meter.count)
+
+
+def _writer(path, fps, size, codec, bitrate, encoder_options, total=None):
+    options = {'bitrate': bitrate}
+    options.update(encoder_options or {})
+    return _MeteredWriter(open_writer(path, fps, size, codec, **options), total)
+
+
+def _open(video_path):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return cap, fps, frame_count, (width, height)
+
+
+class _ResampledReader:
+    """按输出时间轴顺序读取视频帧，只解码需要显示的帧，结束后保持最后一帧"""
+
+    def __init__(self, cap, fps, frame_count):
+        self.cap = cap
+        self.fps = fps
+        self.frame_count = frame_count
+        self.duration = frame_count / fps
+        self._position = -1
+        self._frame = None
+
+    def frame_at(self, t, hold=False):
+        """返回 t 秒时应显示的帧，超出时长后返回 None（hold 为真时返回最后一帧）"""
+        if t >= self.duration and not hold:
+            return None
+        index = min(int(t * self.fps + 1e-6), self.frame_count - 1)
+        # 中间被跳过的帧只 grab 不解码到 BGR
+        while self._position < index - 1:
+            if not self.cap.grab():
+                return self._frame
+            self._position += 1
+        if self._position < index:
+            ok, frame = self.cap.read()
+            if ok:
+                self._frame = frame
+            self._position += 1
+        return self._frame
+
+    def release(self):
+        self.cap.release()
+
+
+class InsetCompositor:
+    """画中画合成器：把小图按背景高度的 scale 缩放后贴到背景右下角
+
+    画布和缩放缓冲区预先分配，逐帧只做一次拷贝和一次区域贴图。
+    """
+
+    def __init__(self, background_size, inset_size, scale=0.25, margin=10):
+        width, height = background_size
+        inset_width, inset_height = inset_size
+        self.inset_height = int(round(height * scale))
+        self.inset_width = int(round(inset_width * self.inset_height / inset_height))
+        self.x = width - self.inset_width - margin
+        self.y = height - self.inset_height - margin
+        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self._inset_buffer = np.empty((self.inset_height, self.inset_width, 3), dtype=np.uint8)
+
+    def compose(self, background, inset):
+        """background 为 None 时保留上一帧背景，inset 为 None 时不叠加小图"""
+        if background is not None:
+            np.copyto(self.canvas, background)
+        if inset is not None:
+            cv2.resize(inset, (self.inset_width, self.inset_height), dst=self._inset_buffer,
+                       interpolation=cv2.INTER_AREA)
+            self.canvas[self.y:self.y + self.inset_height, self.x:self.x + self.inset_width] = self._inset_buffer
+        return self.canvas
+
+
+@instrumented
+def overlay_videos(video1_path, video2_path, merged_video_path, scale=0.25, margin=10, bitrate='5000k', codec='x264',
+                   encoder_options=None):
+    """画中画合成：video2 按 video1 高度的 scale 缩放后叠加到 video1 右下角
+
+    时长取两者较长者，video1 提前结束时保持最后一帧，video2 结束后不再叠加。
+    """
+    cap1, fps1, count1, (width1, height1) = _open(video1_path)
+    cap2, fps2, count2, (width2, height2) = _open(video2_path)
+    background = _ResampledReader(cap1, fps1, count1)
+    inset = _ResampledReader(cap2, fps2, count2)
+
+    compositor = InsetCompositor((width1, height1), (width2, height2), scale, margin)
+    total_frames = int(np.ceil(max(background.duration, inset.duration) * fps1))
+
+    writer = _writer(merged_video_path, fps1, (width1, height1), codec, bitrate, encoder_options, total_frames)
+    try:
+        for k in range(total_frames):
+            t = k / fps1
+            writer.write(compositor.compose(background.frame_at(t, hold=True), inset.frame_at(t)))
+    finally:
+        writer.release()
+        background.release()
+        inset.release()
+
+
+@instrumented
+def overlay_aligned_data(video_path, merged_video_path, data_indices, epsilon, sigma, xlim, ylim,
+                         scale=0.25, margin=10, bitrate='5000k', codec='x264', encoder_options=None, decimate=None):
+    """逐帧按对齐结果绘制应力-应变小图并叠加到视频右下角，不再经过中间的应力视频
+
+    data_indices[k] 为第 k 帧对应的数据序号（-1 表示尚无数据），其长度决定输出帧数。
+    decimate 为 'minmax' 或 'lttb' 时先按帧精简轨迹点，见 insitu.decimate.decimate_to_frames。
+    """
+    if decimate is not None:
+        kept, data_indices = decimate_to_frames(data_indices, epsilon, sigma, decimate)
+        epsilon, sigma = np.asarray(epsilon)[kept], np.asarray(sigma)[kept]
+
+    cap, fps, frame_count, size = _open(video_path)
+    # matplotlib 只在需要绘图时导入
+    from insitu.render import StressStrainRenderer
+
+    renderer = StressStrainRenderer(xlim, ylim)
+    compositor = InsetCompositor(size, renderer.frame_size, scale, margin)
+    inset = renderer.frame()
+    drawn = 0
+
+    writer = _writer(merged_video_path, fps, size, codec, bitrate, encoder_options, len(data_indices))
+    try:
+        for index in data_indices:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if index >= drawn:
+                renderer.add_points(epsilon[drawn:index + 1], sigma[drawn:index + 1])
+                drawn = index + 1
+                inset = renderer.frame()
+            writer.write(compositor.compose(frame, inset))
+    finally:
+        writer.release()
+        cap.release()
+
+
+@instrumented
+def concatenate_videos(video1_path, video2_path, merged_video_path, color=(255, 255, 255), bitrate='5000k', codec='x264',
+                       encoder_options=None):
+    """顺序拼接：video1 等比缩放到 video2 的尺寸内并居中，其余区域用 color 填充
+
+    输出帧率取 video1 的帧率，video2 按时间重采样。
+    """
+    cap1, fps1, count1, (width1, height1) = _open(video1_path)
+    cap2, fps2, count2, (width2, height2) = _open(video2_path)
+    first = _ResampledReader(cap1, fps1, count1)
+    second = _ResampledReader(cap2, fps2, count2)
+
+    # 等比缩放到 video2 的高度，过宽时改为按宽度缩放
+    ratio = min(height2 / height1, width2 / width1)
+    fit_width, fit_height = int(round(width1 * ratio)), int(round(height1 * ratio))
+    x = (width2 - fit_width) // 2
+    y = (height2 - fit_height) // 2
+
+    canvas = np.empty((height2, width2, 3), dtype=np.uint8)
+    canvas[:] = color[::-1]  # RGB -> BGR
+    fit_buffer = np.empty((fit_height, fit_width, 3), dtype=np.uint8)
+
+    writer = _writer(merged_video_path, fps1, (width2, height2), codec, bitrate, encoder_options,
+                     count1 + int(np.ceil(second.duration * fps1)))
+    try:
+        for k in range(count1):
+            frame = first.frame_at(k / fps1)
+            if frame is None:
+                break
+            cv2.resize(frame, (fit_width, fit_height), dst=fit_buffer, interpolation=cv2.INTER_AREA)
+            canvas[y:y + fit_height, x:x + fit_width] = fit_buffer
+            writer.write(canvas)
+
+        for k in range(int(np.ceil(second.duration * fps1))):
+            frame = second.frame_at(k / fps1)
+            if frame is None:
+                break
+            writer.write(frame)
+    finally:
+        writer.release()
+        first.release()
+        second.release()
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+def minmax_buckets(y, bounds):
+    """每个分桶保留首点、最小值点、最大值点和末点，返回排序去重后的数据序号
+
+    bounds 为各分桶的起点序号（升序，首项为 0），最后一个分桶延伸到数据末尾。
+    """
+    y = np.asarray(y, dtype=float)
+    bounds = np.asarray(bounds, dtype=np.intp)
+    if y.size == 0:
+        return np.empty(0, dtype=np.intp)
+    ends = np.append(bounds[1:], y.size) - 1
+
+    # 按 (分桶, 数值) 排序后，每个分桶的首尾即最小值和最大值所在位置
+    bucket = np.repeat(np.arange(bounds.size), np.diff(np.append(bounds, y.size)))
+    order = np.lexsort((np.nan_to_num(y, nan=np.inf), bucket))
+    argmin = order[bounds]
+    order = np.lexsort((np.nan_to_num(y, nan=-np.inf), bucket))
+    argmax = order[ends]
+    return np.unique(np.concatenate((bounds, argmin, argmax, ends)))
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的序号（含首末点）"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # 下一个分桶的均值作为第三个顶点，最后一个分桶用末点
+        if i + 2 < n_out - 1:
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def decimate_to_frames(frame_indices, x, y, method='minmax', points_per_frame=4):
+    """按视频帧时间轴精简数据点，返回 (保留的数据序号, 精简后的每帧数据序号)
+
+    frame_indices[k] 为第 k 帧显示的数据序号（单调不减，-1 表示尚无数据）。相邻两帧之间的
+    数据点只保留保持曲线形状的少数点：'minmax' 保留每段的首末点和 σ 的极值点，'lttb' 在整条
+    曲线上按每帧 points_per_frame 个点做 LTTB 选点。每帧的当前点总会保留，渲染开销只与帧数有关。
+    """
+    frame_indices = np.asarray(frame_indices, dtype=np.intp)
+    shown = frame_indices[frame_indices >= 0]
+    if shown.size == 0:
+        return np.empty(0, dtype=np.intp), frame_indices.copy()
+    last = int(shown.max())
+    frame_ends = np.unique(shown)
+
+    if method == 'minmax':
+        bounds = np.unique(np.append(0, frame_ends[:-1] + 1))
+        kept = minmax_buckets(np.asarray(y, dtype=float)[:last + 1], bounds)
+    elif method == 'lttb':
+        selected = lttb(np.asarray(x, dtype=float)[:last + 1], np.asarray(y, dtype=float)[:last + 1],
+                        frame_ends.size * points_per_frame)
+        kept = np.union1d(selected, frame_ends)
+    else:
+        raise ValueError(f"不支持的降采样方法: {method}")
+
+    kept = np.union1d(kept, frame_ends)
+    mapped = np.where(frame_indices >= 0, np.searchsorted(kept, frame_indices), -1)
+    return kept, mapped
@@ -0,0 +1,96 @@
+import shutil
+import subprocess
+
+import numpy as np
+
+# 编码器别名 -> ffmpeg 编码器名
+CODECS = {
+    'x264': 'libx264',
+    'h264': 'libx264',
+    'libx264': 'libx264',
+    'x265': 'libx265',
+    'hevc': 'libx265',
+    'libx265': 'libx265',
+    'ffv1': 'ffv1',
+}
+# 无损编码器：保持 BGR 像素格式，不做色度抽样，适合存档中间视频
+LOSSLESS_CODECS = {'ffv1'}
+# 找不到 ffmpeg 时改用的 OpenCV FourCC
+FALLBACK_FOURCC = 'XVID'
+
+_ffmpeg_exe = None
+
+
+def ffmpeg_executable():
+    """返回 ffmpeg 可执行文件路径：优先 PATH，其次 imageio-ffmpeg（moviepy 自带）的二进制，都没有时返回 None"""
+    global _ffmpeg_exe
+    if _ffmpeg_exe is None:
+        path = shutil.which('ffmpeg')
+        if path is None:
+            try:
+                import imageio_ffmpeg
+                path = imageio_ffmpeg.get_ffmpeg_exe()
+            except (ImportError, RuntimeError):
+                path = None
+        _ffmpeg_exe = path or ''
+    return _ffmpeg_exe or None
+
+
+class FFmpegWriter:
+    """通过管道把原始 BGR 帧写入常驻的 ffmpeg 进程，接口与 cv2.VideoWriter 一致
+
+    codec 可用 x264/x265/ffv1 等别名；给定 crf 时按质量编码，否则按 bitrate 编码。
+    preset 控制编码速度与体积的取舍，threads 为编码线程数。
+    """
+
+    def __init__(self, path, fps, size, codec='libx264', bitrate='5000k', preset=None, crf=None, threads=None):
+        width, height = size
+        self.path = path
+        self.size = (width, height)
+        codec = CODECS.get(codec.lower(), codec)
+        args = [ffmpeg_executable() or 'ffmpeg', '-v', 'error', '-y',
+                '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+                '-an', '-c:v', codec]
+        if threads:
+            args += ['-threads', str(threads)]
+        if codec in LOSSLESS_CODECS:
+            args += ['-level', '3', '-pix_fmt', 'bgr0', path]
+        else:
+            if preset:
+                args += ['-preset', preset]
+            if crf is not None:
+                args += ['-crf', str(crf)]
+            elif bitrate:
+                args += ['-b:v', bitrate]
+            # yuv420p 要求宽高为偶数，奇数尺寸时补一像素
+            args += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', path]
+        self._proc = subprocess.Popen(args, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self._proc.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self):
+        if self._proc is None:
+            return
+        self._proc.stdin.close()
+        returncode = self._proc.wait()
+        self._proc = None
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg 编码失败 ({returncode}): {self.path}")
+
+
+def open_writer(path, fps, size, codec='XVID', bitrate=None, preset=None, crf=None, threads=None):
+    """按 codec 创建视频写入器
+
+    x264/x265/ffv1 等 ffmpeg 编码器通过管道写入 FFmpegWriter；
+    四字符 FourCC（如 XVID、MJPG）仍使用 cv2.VideoWriter，此时忽略 bitrate、preset、crf、threads。
+    找不到 ffmpeg 时 ffmpeg 编码器退回 FALLBACK_FOURCC 并给出提示。
+    """
+    if codec.lower() in CODECS or codec.startswith('lib'):
+        if ffmpeg_executable() is not None:
+            return FFmpegWriter(path, fps, size, codec, bitrate, preset, crf, threads)
+        print(f"Warning: ffmpeg not found, writing {path} with {FALLBACK_FOURCC} instead of {codec}")
+        codec = FALLBACK_FOURCC
+
+    import cv2
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+class PolynomialModel:
+    """一组多项式模型（每条曲线一行系数），与 numpy Polynomial.fit 一样先把 x 映射到 [-1, 1]
+
+    coef 形状为 (曲线数, 阶数 + 1)，按升幂排列；domain 形状为 (曲线数, 2)。
+    阶数不同的曲线高次系数补零。只有一条曲线时求值返回一维结果。
+    """
+
+    kind = 'poly'
+
+    def __init__(self, coef, domain):
+        self.coef = np.atleast_2d(np.asarray(coef, dtype=float))
+        self.domain = np.atleast_2d(np.asarray(domain, dtype=float))
+        a, b = self.domain[:, 0], self.domain[:, 1]
+        width = np.where(b > a, b - a, 1.0)
+        self._scale = (2 / width)[:, None]
+        self._offset = (-(a + b) / width)[:, None]
+
+    @property
+    def degree(self):
+        """各曲线的实际阶数（最高非零系数的次数）"""
+        nonzero = self.coef != 0
+        return np.where(nonzero.any(axis=1), self.coef.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis=1), 0)
+
+    def __len__(self):
+        return self.coef.shape[0]
+
+    def __call__(self, x):
+        """x 为一维时对所有曲线求值，为 (曲线数, 点数) 时逐条求值"""
+        t = self._offset + self._scale * np.atleast_2d(np.asarray(x, dtype=float))
+        # Horner 法
+        result = np.broadcast_to(self.coef[:, -1:], t.shape).copy()
+        for c in self.coef[:, -2::-1].T:
+            result *= t
+            result += c[:, None]
+        return result[0] if len(self) == 1 else result
+
+    def to_dict(self):
+        return {'kind': self.kind, 'coef': self.coef.tolist(), 'domain': self.domain.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['coef'], data['domain'])
+
+
+class SplineModel:
+    """B 样条模型，包装 scipy.interpolate.BSpline"""
+
+    kind = 'spline'
+
+    def __init__(self, t, c, k):
+        from scipy.interpolate import BSpline
+
+        self.spline = BSpline(np.asarray(t, dtype=float), np.asarray(c, dtype=float), int(k))
+
+    def __call__(self, x):
+        return self.spline(np.asarray(x, dtype=float))
+
+    def to_dict(self):
+        return {'kind': self.kind, 't': self.spline.t.tolist(), 'c': self.spline.c.tolist(), 'k': self.spline.k}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['t'], data['c'], data['k'])
+
+
+class MonotoneModel:
+    """单调的分段三次 Hermite 插值（PCHIP），结点为保序回归后的分块均值"""
+
+    kind = 'monotone'
+
+    def __init__(self, x, y):
+        from scipy.interpolate import PchipInterpolator
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self._interpolator = PchipInterpolator(self.x, self.y) if self.x.size > 1 else None
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        if self._interpolator is None:
+            return np.full(x.shape, self.y[0])
+        # 超出结点范围时保持端点值，不外推，保证单调
+        return self._interpolator(np.clip(x, self.x[0], self.x[-1]))
+
+    def to_dict(self):
+        return {'kind': self.kind, 'x': self.x.tolist(), 'y': self.y.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['x'], data['y'])
+
+
+MODEL_TYPES = {model.kind: model for model in (PolynomialModel, SplineModel, MonotoneModel)}
+
+
+def _as_series(x, y):
+    """把一条或多条曲线整理为 (曲线数, 点数) 的数组，NaN 视为缺失"""
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    x = np.broadcast_to(x, y.shape)
+    if x.shape != y.shape:
+        raise ValueError(f"x 与 y 形状不一致: {x.shape} != {y.shape}")
+    return x, y
+
+
+def polyfit(x, y, degree):
+    """批量最小二乘多项式拟合，x、y 为一维或 (曲线数, 点数)，返回 PolynomialModel
+
+    所有曲线共用同一个批量 QR 分解，不逐条循环；含 NaN 的点不参与拟合。
+    """
+    x, y = _as_series(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if (valid.sum(axis=1) <= degree).any():
+        raise ValueError(f"有效点数不足以拟合 {degree} 阶多项式")
+
+    # 与 Polynomial.fit 相同：按每条曲线的数据范围映射到 [-1, 1]
+    domain = np.stack([np.nanmin(np.where(valid, x, np.nan), axis=1),
+                       np.nanmax(np.where(valid, x, np.nan), axis=1)], axis=1)
+    model = PolynomialModel(np.zeros((x.shape[0], degree + 1)), domain)
+    t = np.where(valid, model._offset + model._scale * np.where(valid, x, 0), 0)
+
+    vander = np.polynomial.polynomial.polyvander(t, degree)
+    vander[~valid] = 0
+    # 列归一化改善病态，缺失点对应的行全为零，不影响最小二乘解
+    norms = np.sqrt((vander ** 2).sum(axis=1, keepdims=True))
+    norms[norms == 0] = 1
+    q, r = np.linalg.qr(vander / norms)
+    rhs = np.swapaxes(q, 1, 2) @ np.where(valid, y, 0)[..., None]
+    model.coef = np.linalg.solve(r, rhs)[..., 0] / norms[:, 0, :]
+    return model
+
+
+def _residual_sum(model, x, y):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    residual = np.where(valid, np.atleast_2d(model(np.where(valid, x, 0))) - y, 0)
+    return (residual ** 2).sum(axis=1), valid.sum(axis=1)
+
+
+def select_degree(x, y, degrees=range(1, 13), method='aic', folds=5):
+    """为每条曲线选择多项式阶数，返回 (各曲线的最佳阶数, 得分数组 (阶数个数, 曲线数))
+
+    method='aic' 使用赤池信息量准则 n·ln(RSS/n) + 2(阶数 + 1)；
+    method='cv' 使用 folds 折交叉验证的均方误差，按点的序号交错分折，每折都覆盖完整的 x 范围。
+    """
+    if method not in ('aic', 'cv'):
+        raise ValueError(f"不支持的阶数选择方法: {method}")
+    x, y = _as_series(x, y)
+    degrees = list(degrees)
+    scores = np.full((len(degrees), x.shape[0]), np.inf)
+    fold = np.arange(x.shape[1]) % folds
+
+    for i, degree in enumerate(degrees):
+        try:
+            if method == 'aic':
+                rss, n = _residual_sum(polyfit(x, y, degree), x, y)
+                scores[i] = n * np.log(np.maximum(rss, np.finfo(float).tiny) / n) + 2 * (degree + 1)
+            else:
+                total = np.zeros(x.shape[0])
+                count = np.zeros(x.shape[0])
+                for k in range(folds):
+                    model = polyfit(np.where(fold == k, np.nan, x), y, degree)
+                    rss, n = _residual_sum(model, np.where(fold == k, x, np.nan), y)
+                    total += rss
+                    count += n
+                scores[i] = total / np.maximum(count, 1)
+        except np.linalg.LinAlgError:
+            continue
+        except ValueError:
+            # 点数不足以拟合更高阶数
+            break
+
+    best = np.array(degrees)[np.argmin(scores, axis=0)]
+    return best, scores
+
+
+def fit_polynomial(x, y, degree='aic', max_degree=12, folds=5):
+    """多项式拟合，degree 为整数时直接拟合，为 'aic' 或 'cv' 时为每条曲线自动选择阶数"""
+    if not isinstance(degree, str):
+        return polyfit(x, y, degree)
+
+    x, y = _as_series(x, y)
+    best, _ = select_degree(x, y, range(1, max_degree + 1), degree, folds)
+    coef = np.zeros((x.shape[0], best.max() + 1))
+    domain = np.zeros((x.shape[0], 2))
+    for degree in np.unique(best):
+        rows = best == degree
+        fitted = polyfit(x[rows], y[rows], int(degree))
+        coef[rows, :degree + 1] = fitted.coef
+        domain[rows] = fitted.domain
+    return PolynomialModel(coef, domain)
+
+
+def _sorted_unique(x, y):
+    """去掉 NaN 并按 x 排序，重复的 x 取 y 的均值"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, inverse = np.unique(x[valid], return_inverse=True)
+    y = np.bincount(inverse, weights=y[valid]) / np.bincount(inverse)
+    return x, y
+
+
+def fit_spline(x, y, lam=None):
+    """平滑样条拟合，lam 为 None 时按广义交叉验证自动选择平滑参数"""
+    from scipy.interpolate import make_smoothing_spline
+
+    x, y = _sorted_unique(x, y)
+    spline = make_smoothing_spline(x, y, lam=lam)
+    return SplineModel(spline.t, spline.c, spline.k)
+
+
+def isotonic_regression(y, increasing=True):
+    """保序回归（相邻违序合并算法），返回 (各分块起点序号, 分块均值)"""
+    y = np.asarray(y, dtype=float)
+    if not increasing:
+        starts, means = isotonic_regression(-y)
+        return starts, -means
+
+    starts, means, weights = [], [], []
+    for i, value in enumerate(y):
+        starts.append(i)
+        means.append(value)
+        weights.append(1.0)
+        while len(means) > 1 and means[-2] > means[-1]:
+            weight = weights[-2] + weights[-1]
+            means[-2] = (means[-2] * weights[-2] + means[-1] * weights[-1]) / weight
+            weights[-2] = weight
+            del starts[-1], means[-1], weights[-1]
+    return np.array(starts, dtype=np.intp), np.array(means)
+
+
+def fit_monotone(x, y, increasing=True):
+    """单调拟合：保序回归后以各分块的 x 均值和 y 均值为结点做 PCHIP 插值"""
+    x, y = _sorted_unique(x, y)
+    starts, means = isotonic_regression(y, increasing)
+    block_x = np.add.reduceat(x, starts) / np.diff(np.append(starts, x.size))
+    return MonotoneModel(block_x, means)
+
+
+def evaluate(model, x, chunksize=1000000):
+    """分块求值，百万级的点也不会一次性分配中间数组"""
+    x = np.asarray(x, dtype=float)
+    if x.ndim != 1 or x.size <= chunksize:
+        return model(x)
+    first = np.asarray(model(x[:chunksize]))
+    result = np.empty(first.shape[:-1] + (x.size,))
+    result[..., :chunksize] = first
+    for start in range(chunksize, x.size, chunksize):
+        result[..., start:start + chunksize] = model(x[start:start + chunksize])
+    return result
+
+
+def save_model(model, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(model.to_dict(), f)
+
+
+def load_model(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return MODEL_TYPES[data['kind']].from_dict(data)
+
+
+def fit(x, y, kind='poly', cache_dir=None, **params):
+    """按 kind（'poly'、'spline'、'monotone'）拟合，给定 cache_dir 时按数据和参数的哈希缓存模型
+
+    相同数据和参数再次拟合时直接读取保存的模型，不重新计算。
+    """
+    fitters = {'poly': fit_polynomial, 'spline': fit_spline, 'monotone': fit_monotone}
+    if kind not in fitters:
+        raise ValueError(f"不支持的拟合类型: {kind}")
+    if cache_dir is None:
+        return fitters[kind](x, y, **params)
+
+    digest = hashlib.sha256(json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str).encode('utf-8'))
+    for values in (x, y):
+        values = np.ascontiguousarray(values, dtype=float)
+        digest.update(str(values.shape).encode('utf-8'))
+        digest.update(values.data)
+    path = os.path.join(cache_dir, f'{digest.hexdigest()}.json')
+    if os.path.exists(path):
+        return load_model(path)
+
+    model = fitters[kind](x, y, **params)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_model(model, path)
+    return model
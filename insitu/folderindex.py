@@ -0,0 +1,95 @@
+import json
+import os
+
+import numpy as np
+from insitu.timeparse import parse_filename_seconds
+
+
+class ImageFolderIndex:
+    """图像文件夹索引：按名称排序的帧序号和解析后的时间戳
+
+    只用 os.scandir 扫描一次，结果写入文件夹内的 sidecar 文件；目录修改时间
+    晚于 sidecar 时视为失效并重新扫描。名称查询为 O(1)，最近时间戳查询为 O(log n)。
+    """
+
+    SIDECAR_NAME = '.image_index.json'
+    _cache = {}
+
+    def __init__(self, folder, names, suffix='.jpg'):
+        self.folder = folder
+        self.suffix = suffix
+        self.names = names
+        self.positions = {name: i for i, name in enumerate(names)}
+        self.timestamps = parse_filename_seconds(names) if names else np.empty(0)
+        # 时间戳排序后的帧序号，无法解析的文件名（NaN）排在最后
+        self._order = np.argsort(self.timestamps, kind='stable')
+        self._sorted_timestamps = self.timestamps[self._order]
+        self._valid_count = int(np.count_nonzero(~np.isnan(self.timestamps)))
+
+    @classmethod
+    def open(cls, folder, suffix='.jpg', sidecar=True):
+        """获取文件夹索引，优先使用进程内缓存和 sidecar 文件"""
+        key = (os.path.abspath(folder), suffix)
+        folder_mtime = os.stat(folder).st_mtime_ns
+        cached = cls._cache.get(key)
+        if cached is not None and cached[0] == folder_mtime:
+            return cached[1]
+
+        index = cls._load_sidecar(folder, suffix, folder_mtime) if sidecar else None
+        if index is None:
+            index = cls.scan(folder, suffix)
+            if sidecar:
+                index.save_sidecar()
+                folder_mtime = os.stat(folder).st_mtime_ns
+        cls._cache[key] = (folder_mtime, index)
+        return index
+
+    @classmethod
+    def scan(cls, folder, suffix='.jpg'):
+        with os.scandir(folder) as entries:
+            names = sorted(entry.name for entry in entries if entry.name.endswith(suffix))
+        return cls(folder, names, suffix)
+
+    @classmethod
+    def _load_sidecar(cls, folder, suffix, folder_mtime):
+        path = os.path.join(folder, cls.SIDECAR_NAME)
+        try:
+            if os.stat(path).st_mtime_ns < folder_mtime:
+                return None
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('suffix') != suffix:
+            return None
+        return cls(folder, data['names'], suffix)
+
+    def save_sidecar(self):
+        """写入 sidecar，并把其修改时间设为不早于写入后的目录修改时间"""
+        path = os.path.join(self.folder, self.SIDECAR_NAME)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'suffix': self.suffix, 'names': self.names}, f)
+            os.replace(tmp_path, path)
+            folder_mtime = os.stat(self.folder).st_mtime_ns
+            os.utime(path, ns=(folder_mtime, max(folder_mtime, os.stat(path).st_mtime_ns)))
+        except OSError as e:
+            print(f"无法写入索引文件 {path}: {e}")
+
+    def __len__(self):
+        return len(self.names)
+
+    def index_of(self, image_name):
+        """返回图像在排序后列表中的帧序号，不存在时返回 -1"""
+        return self.positions.get(image_name, -1)
+
+    def nearest(self, seconds):
+        """返回时间戳最接近 seconds（当天总秒数）的帧序号"""
+        if self._valid_count == 0:
+            return -1
+        valid = self._sorted_timestamps[:self._valid_count]
+        pos = int(np.searchsorted(valid, seconds))
+        if pos == self._valid_count or (pos > 0 and seconds - valid[pos - 1] <= valid[pos] - seconds):
+            pos -= 1
+        return int(self._order[pos])
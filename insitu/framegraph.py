@@ -0,0 +1,179 @@
+import json
+import os
+import cv2
+import numpy as np
+from insitu.encoder import open_writer
+from insitu.instrument import get_recorder
+from insitu.pipeline import prefetch_map
+from insitu.transform import FrameTransform
+
+
+def load_frame(img_path, crop_area, size):
+    """读取并裁剪单帧图像，读取失败时返回 None"""
+    img = cv2.imread(img_path)
+    if img is None or not crop_area:
+        return img
+
+    return FrameTransform(crop_area, size)(img)
+
+
+def iter_image_frames(image_paths, crop_area, size, workers=None):
+    """并行预取解码，按顺序产出 (帧序号, 文件名, 图像)，读取失败的图像为 None
+
+    size 为 None 时保持裁剪尺寸，不缩放。
+    """
+    transform = FrameTransform(crop_area, size) if crop_area else None
+
+    def load(img_path):
+        img = cv2.imread(img_path)
+        if img is None or transform is None:
+            return img
+        return transform(img)
+
+    frames = prefetch_map(load, image_paths, workers)
+    for index, (img_path, frame) in enumerate(zip(image_paths, frames)):
+        yield index, os.path.basename(img_path), frame
+
+
+FRAME_LIST_SUFFIX = '.frames.json'
+
+
+def frame_list_path(video_path):
+    return video_path + FRAME_LIST_SUFFIX
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_frame_list(video_path, names, source=None):
+    """在视频旁写出各帧对应的图像文件名（读取失败被跳过的图像不在其中）
+
+    视频由另一视频拆分而来时给定 source，同时记录源视频的大小和修改时间。
+    """
+    frame_list = {'names': list(names)}
+    if source is not None:
+        frame_list['source'] = _file_signature(source)
+    with open(frame_list_path(video_path), 'w', encoding='utf-8') as f:
+        json.dump(frame_list, f)
+
+
+def read_frame_list(video_path, source=None):
+    """读取视频各帧对应的图像文件名，没有帧列表或帧列表早于视频时返回 None
+
+    给定 source 时，帧列表记录的源视频大小和修改时间与 source 当前不一致（源视频已重新生成）也返回 None。
+    """
+    path = frame_list_path(video_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(video_path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            frame_list = json.load(f)
+        if source is not None and frame_list.get('source') != _file_signature(source):
+            return None
+        return frame_list['names']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class VideoSink:
+    """视频输出端，只接收帧序号在 [start, stop) 内的帧，写入器在首帧到达时创建
+
+    encoder_options 为传给 open_writer 的编码参数（bitrate、preset、crf、threads）。
+    释放时在视频旁写出帧列表（见 write_frame_list），视频第 i 帧即 names[i]。
+    """
+
+    def __init__(self, path, codec, fps, start=0, stop=None, encoder_options=None):
+        self.path = path
+        self.codec = codec
+        self.encoder_options = encoder_options or {}
+        self.fps = fps
+        self.start = start
+        self.stop = stop
+        self.frame_count = 0
+        self.names = []
+        self._writer = None
+
+    def accepts(self, index):
+        return index >= self.start and (self.stop is None or index < self.stop)
+
+    def write(self, index, name, frame):
+        if not self.accepts(index):
+            return
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = open_writer(self.path, self.fps, (width, height), self.codec, **self.encoder_options)
+        self._write(name, frame)
+        self.names.append(name)
+        self.frame_count += 1
+
+    def _write(self, name, frame):
+        self._writer.write(frame)
+
+    def release(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+            write_frame_list(self.path, self.names)
+            get_recorder().count('frames_written', self.frame_count)
+
+
+class AnnotatedVideoSink(VideoSink):
+    """在左上角写入文件名的视频输出端
+
+    文字直接画在共享帧上，写完后用预分配的缓冲区恢复被覆盖的条带，
+    不复制整帧，其他输出端看到的仍是原始画面。
+    """
+
+    def __init__(self, path, codec, fps, start=0, stop=None, encoder_options=None, origin=(10, 30),
+                 font_scale=1, color=(255, 255, 255), thickness=2):
+        super().__init__(path, codec, fps, start, stop, encoder_options)
+        self.origin = origin
+        self.font_scale = font_scale
+        self.color = color
+        self.thickness = thickness
+        # 文字所在的水平条带，覆盖字形的上伸和下伸部分
+        text_height = int(np.ceil(30 * font_scale)) + thickness
+        self._rows = slice(max(origin[1] - text_height, 0), origin[1] + text_height // 2 + thickness)
+        self._backup = None
+        self._frame_buffer = None
+
+    def _write(self, name, frame):
+        # 只读帧（如内存映射的帧存储）先复制到复用的缓冲区
+        if not frame.flags.writeable:
+            if self._frame_buffer is None or self._frame_buffer.shape != frame.shape:
+                self._frame_buffer = np.empty_like(frame)
+            np.copyto(self._frame_buffer, frame)
+            frame = self._frame_buffer
+        strip = frame[self._rows]
+        if self._backup is None or self._backup.shape != strip.shape:
+            self._backup = np.empty_like(strip)
+        np.copyto(self._backup, strip)
+
+        cv2.putText(frame, name, self.origin, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale,
+                    self.color, self.thickness, cv2.LINE_AA)
+        self._writer.write(frame)
+        np.copyto(strip, self._backup)
+
+
+def run_frame_graph(frames, sinks, meter=None):
+    """把一路解码帧流分发给多个输出端，源图像只读取一次
+
+    frames 为 (帧序号, 名称, 图像) 序列，图像为 None 的帧会被跳过。
+    """
+    recorder = get_recorder()
+    try:
+        for index, name, frame in frames:
+            if frame is None:
+                print(f"Warning: Unable to read image {name}. Skipping...")
+                recorder.count('frames_skipped')
+                continue
+            recorder.count('frames_decoded')
+            for sink in sinks:
+                sink.write(index, name, frame)
+            if meter is not None:
+                meter.update()
+    finally:
+        for sink in sinks:
+            sink.release()
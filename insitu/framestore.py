@@ -0,0 +1,134 @@
+import json
+import os
+
+import cv2
+import numpy as np
+from insitu.folderindex import ImageFolderIndex
+from insitu.pipeline import prefetch_map
+from insitu.timeparse import parse_filename_seconds
+
+
+class FrameStore:
+    """解码一次、反复使用的裁剪帧栈
+
+    帧保存为 frames.npy（帧数 × 高 × 宽 × 通道 的 uint8 数组），以内存映射方式打开，
+    切片不复制数据；index.json 记录文件名、由文件名解析的时间戳、裁剪参数和可读标记。
+    index.json 在全部帧写完后才生成，构建中断的存储不会被误用。
+    """
+
+    FRAMES_NAME = 'frames.npy'
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, store_dir, frames, names, valid, params):
+        self.store_dir = store_dir
+        self.frames = frames
+        self.names = names
+        self.valid = valid
+        self.params = params
+        self.positions = {name: i for i, name in enumerate(names)}
+        self.timestamps = parse_filename_seconds(names)
+
+    @classmethod
+    def open(cls, store_dir, mode='r'):
+        with open(os.path.join(store_dir, cls.INDEX_NAME), encoding='utf-8') as f:
+            index = json.load(f)
+        frames = np.load(os.path.join(store_dir, cls.FRAMES_NAME), mmap_mode=mode)
+        return cls(store_dir, frames, index['names'], np.array(index['valid'], dtype=bool), index['params'])
+
+    @classmethod
+    def build(cls, image_folder, store_dir, crop_area=None, size=None, workers=None):
+        """解码文件夹中的全部图像，裁剪（并可缩放到 size）后写入存储，无法读取的帧填零"""
+        folder_index = ImageFolderIndex.open(image_folder)
+        names = folder_index.names
+        if not names:
+            raise ValueError(f"文件夹中没有图像: {image_folder}")
+
+        os.makedirs(store_dir, exist_ok=True)
+        index_path = os.path.join(store_dir, cls.INDEX_NAME)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        def decode(name):
+            img = cv2.imread(os.path.join(image_folder, name))
+            if img is None:
+                return None
+            if crop_area:
+                x, y, w, h = crop_area
+                img = img[y:y+h, x:x+w]
+            if size is not None:
+                img = cv2.resize(img, tuple(size))
+            return img
+
+        frames = None
+        valid = np.zeros(len(names), dtype=bool)
+        for i, img in enumerate(prefetch_map(decode, names, workers)):
+            if img is None:
+                continue
+            if frames is None:
+                # 帧尺寸取第一张可读图像，此前无法读取的帧保持为零
+                frames = np.lib.format.open_memmap(os.path.join(store_dir, cls.FRAMES_NAME), mode='w+',
+                                                   dtype=np.uint8, shape=(len(names),) + img.shape)
+            if img.shape != frames.shape[1:]:
+                print(f"Warning: Image {names[i]} has shape {img.shape}, expected {frames.shape[1:]}. Skipping...")
+                continue
+            frames[i] = img
+            valid[i] = True
+        if frames is None:
+            raise ValueError(f"文件夹中没有可读取的图像: {image_folder}")
+        frames.flush()
+        del frames
+
+        params = {
+            'image_folder': os.path.abspath(image_folder),
+            'folder_mtime_ns': os.stat(image_folder).st_mtime_ns,
+            'crop_area': list(crop_area) if crop_area else None,
+            'size': list(size) if size is not None else None,
+        }
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump({'names': names, 'valid': valid.tolist(), 'params': params}, f)
+        return cls.open(store_dir)
+
+    @classmethod
+    def open_or_build(cls, image_folder, store_dir, crop_area=None, size=None, workers=None):
+        """存储与图像文件夹及裁剪参数一致时直接打开，否则重新构建"""
+        try:
+            store = cls.open(store_dir)
+        except (OSError, ValueError, KeyError):
+            store = None
+        if store is not None and store.matches(image_folder, crop_area, size):
+            return store
+        return cls.build(image_folder, store_dir, crop_area, size, workers)
+
+    def matches(self, image_folder, crop_area=None, size=None):
+        return (self.params['image_folder'] == os.path.abspath(image_folder)
+                and self.params['folder_mtime_ns'] == os.stat(image_folder).st_mtime_ns
+                and self.params['crop_area'] == (list(crop_area) if crop_area else None)
+                and self.params['size'] == (list(size) if size is not None else None))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, item):
+        return self.frames[item]
+
+    @property
+    def frame_size(self):
+        """(宽, 高)"""
+        return self.frames.shape[2], self.frames.shape[1]
+
+    def index_of(self, image_name):
+        return self.positions.get(image_name, -1)
+
+    def between(self, start_seconds, stop_seconds):
+        """返回时间戳在 [start_seconds, stop_seconds) 内的连续帧视图（不复制）
+
+        文件名按名称排序即按时间排序，要求文件名均可解析且不跨越午夜。
+        """
+        start = int(np.searchsorted(self.timestamps, start_seconds))
+        stop = int(np.searchsorted(self.timestamps, stop_seconds))
+        return self.frames[start:stop]
+
+    def iter_frames(self, start=0, stop=None):
+        """按顺序产出 (帧序号, 文件名, 图像)，格式与 framegraph.iter_image_frames 相同"""
+        for index in range(start, len(self) if stop is None else stop):
+            yield index, self.names[index], self.frames[index] if self.valid[index] else None
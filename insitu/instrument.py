@@ -0,0 +1,193 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+
+class Recorder:
+    """结构化的性能记录：阶段计时、计数器、队列深度和节流的进度输出，以 JSON lines 写出
+
+    path 为 JSON lines 文件，为 None 时不写出事件；console 为真时在标准错误上显示进度条。
+    profile_dir 不为 None 时用 cProfile 采样最外层的阶段并把统计保存为 <阶段名>.prof；
+    trace_memory 为真时用 tracemalloc 记录各阶段的 Python 内存峰值。
+    计数器和队列深度只在内存中累加，不做 I/O，可以放在逐帧的循环中。
+    """
+
+    def __init__(self, path=None, progress_interval=1.0, profile_dir=None, trace_memory=False, console=True):
+        self.path = path
+        self.progress_interval = progress_interval
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.console = console
+        self.counters = {}
+        self.gauges = {}
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+        self._lock = threading.Lock()
+        self._stages = []
+        self._memory_peaks = []
+        self._last_progress = {}
+
+    def emit(self, event, **fields):
+        if self._file is None:
+            return
+        record = {'time': time.time(), 'event': event, 'pid': os.getpid()}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """记录队列深度等瞬时值，阶段结束时汇总为次数、均值和最大值"""
+        stats = self.gauges.get(name)
+        if stats is None:
+            self.gauges[name] = [1, value, value]
+        else:
+            stats[0] += 1
+            stats[1] += value
+            if value > stats[2]:
+                stats[2] = value
+
+    def progress(self, name, done, total=None, unit='frames', interval=None):
+        """节流的进度显示：每个名称最多每 interval（默认 progress_interval）秒输出一次，完成时总会输出"""
+        now = time.perf_counter()
+        start, last = self._last_progress.get(name, (now, now))
+        finished = total is not None and done >= total
+        if interval is None:
+            interval = self.progress_interval
+        if now - last < interval and not finished:
+            self._last_progress.setdefault(name, (start, last))
+            return
+        self._last_progress[name] = (start, now)
+
+        elapsed = now - start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        if self.console:
+            if total:
+                filled = int(30 * min(done / total, 1))
+                bar = f"[{'#' * filled}{'.' * (30 - filled)}] {done}/{total}"
+            else:
+                bar = f"{done}"
+            sys.stderr.write(f"\r{name}: {bar} {unit}, {rate:.1f} {unit}/s" + ('\n' if finished else ''))
+            sys.stderr.flush()
+        self.emit('progress', name=name, done=done, total=total, unit=unit, rate=rate)
+        if finished:
+            del self._last_progress[name]
+
+    def error(self, name, exc):
+        """记录异常（含 traceback），并在控制台打印一行说明"""
+        print(f"{name} 发生错误: {exc}")
+        self.emit('error', name=name, error=f"{type(exc).__name__}: {exc}",
+                  traceback=''.join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        """阶段计时，结束时输出耗时以及阶段内计数器的增量和队列深度统计"""
+        counters_before = dict(self.counters)
+        gauges_before = self.gauges
+        self.gauges = {}
+        self._stages.append(name)
+        self.emit('stage_start', stage=name, **fields)
+
+        profiler = None
+        # cProfile 不能嵌套启用，只采样最外层的阶段
+        if self.profile_dir is not None and len(self._stages) == 1:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        tracing = False
+        if self.trace_memory:
+            import tracemalloc
+
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            # reset_peak 会清掉外层阶段已达到的峰值，先把它并入外层阶段的记录
+            if self._memory_peaks:
+                self._memory_peaks[-1] = max(self._memory_peaks[-1], tracemalloc.get_traced_memory()[1])
+            self._memory_peaks.append(0)
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield self
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            result = {'stage': name, 'status': status, 'seconds': seconds}
+            result['counters'] = {key: value - counters_before.get(key, 0) for key, value in self.counters.items()
+                                  if value != counters_before.get(key, 0)}
+            result['gauges'] = {key: {'samples': n, 'mean': total / n, 'max': peak}
+                                for key, (n, total, peak) in self.gauges.items()}
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                result['profile'] = os.path.join(self.profile_dir, f"{name}.prof")
+                profiler.dump_stats(result['profile'])
+            if self.trace_memory:
+                import tracemalloc
+
+                peak = max(self._memory_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._memory_peaks:
+                    self._memory_peaks[-1] = max(self._memory_peaks[-1], peak)
+                result['traced_peak_bytes'] = peak
+                if tracing:
+                    tracemalloc.stop()
+
+            self._stages.pop()
+            self.gauges = gauges_before
+            result.update(fields)
+            self.emit('stage', **result)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def instrumented(func):
+    """把函数的每次调用记录为与函数同名的阶段"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with get_recorder().stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _from_environment():
+    """默认记录器由环境变量配置：INSITU_TRACE（JSON lines 文件）、INSITU_PROFILE（.prof 目录）、
+    INSITU_TRACEMALLOC（设为 1 时记录内存峰值）、INSITU_PROGRESS_INTERVAL（进度输出间隔，秒）"""
+    return Recorder(os.environ.get('INSITU_TRACE') or None,
+                    float(os.environ.get('INSITU_PROGRESS_INTERVAL', 1.0)),
+                    os.environ.get('INSITU_PROFILE') or None,
+                    os.environ.get('INSITU_TRACEMALLOC') == '1')
+
+
+_recorder = None
+
+
+def get_recorder():
+    global _recorder
+    if _recorder is None:
+        _recorder = _from_environment()
+    return _recorder
+
+
+def configure(path=None, progress_interval=1.0, profile_dir=None, trace_memory=False, console=True):
+    """替换全局记录器，返回新的记录器"""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = Recorder(path, progress_interval, profile_dir, trace_memory, console)
+    return _recorder
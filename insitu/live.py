@@ -0,0 +1,276 @@
+import io
+import os
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+from insitu.compositor import InsetCompositor
+from insitu.encoder import open_writer
+from insitu.framegraph import load_frame
+from insitu.render import StressStrainRenderer
+from insitu.smoothing import StreamingSavgol
+from insitu.tableio import read_table
+from insitu.timeparse import parse_filename_seconds, parse_time_seconds
+
+
+class GrowableArray:
+    """按容量翻倍扩展的一维数组，追加和从头部取走的均摊开销与已有长度无关
+
+    values 返回当前内容的视图，下次 append 后可能失效。
+    """
+
+    def __init__(self, dtype=float, capacity=1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._start = 0
+        self._stop = 0
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def values(self):
+        return self._data[self._start:self._stop]
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        if self._stop + values.size > self._data.size:
+            size = len(self)
+            needed = size + values.size
+            capacity = max(self._data.size, 1)
+            # 至少留出一半空闲容量，搬移的元素数不超过此后可追加的元素数
+            while capacity < 2 * needed:
+                capacity *= 2
+            data = self._data if capacity == self._data.size else np.empty(capacity, dtype=self._data.dtype)
+            data[:size] = self._data[self._start:self._stop]
+            self._data, self._start, self._stop = data, 0, size
+        self._data[self._stop:self._stop + values.size] = values
+        self._stop += values.size
+
+    def consume(self, count):
+        """从头部取走 count 个元素"""
+        self._start += min(count, len(self))
+
+
+class FolderTailer:
+    """轮询图像文件夹，按时间顺序返回新出现的 image-HHMMSS_mmm.jpg"""
+
+    def __init__(self, folder, settle_time=0.5):
+        self.folder = folder
+        self.settle_time = settle_time
+        self._seen = set()
+
+    def poll(self):
+        """返回新图像的 (文件名数组, 当天总秒数数组)，只包含已写完（一段时间未修改）的文件"""
+        now = time.time()
+        names = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name in self._seen or not entry.name.endswith('.jpg'):
+                    continue
+                # 相机仍在写入的文件先跳过，下次轮询再处理
+                if now - entry.stat().st_mtime < self.settle_time:
+                    continue
+                names.append(entry.name)
+
+        names = np.array(sorted(names), dtype=object)
+        seconds = parse_filename_seconds(names) if names.size else np.empty(0)
+        valid = ~np.isnan(seconds)
+        self._seen.update(names)
+        order = np.argsort(seconds[valid], kind='stable')
+        return names[valid][order], seconds[valid][order]
+
+
+class LogTailer:
+    """读取仪器日志中新追加的行
+
+    CSV 按字节偏移只读取新写入的完整行；其他格式（如 xlsx）在文件修改后整表重读并返回新增的行，
+    总读取量随采集时长平方增长，长时间实时采集应使用 CSV 日志。
+    """
+
+    def __init__(self, path, sheet_name=None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.is_csv = os.path.splitext(path)[1].lower() == '.csv'
+        self._offset = 0
+        self._header = None
+        self._rows = 0
+        self._mtime = None
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return None
+        if self.is_csv:
+            return self._poll_csv()
+
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        data = read_table(self.path, self.sheet_name)
+        new_rows = data.iloc[self._rows:]
+        self._rows = len(data)
+        return new_rows if len(new_rows) else None
+
+    def _poll_csv(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # 只处理到最后一个换行符，半行留到下次
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return None
+        self._offset += end
+        text = data[:end].decode('utf-8-sig' if self._header is None else 'utf-8')
+        if self._header is None:
+            self._header, _, text = text.partition('\n')
+        if not text.strip():
+            return None
+        return pd.read_csv(io.StringIO(self._header + '\n' + text))
+
+
+class SegmentedVideoWriter:
+    """分段写出的视频，每段写满 segment_frames 帧后关闭，已完成的分段可立即播放
+
+    已完成的分段按 ffmpeg concat 格式记录在 segments.txt 中。
+    """
+
+    def __init__(self, output_dir, fps, codec='XVID', segment_frames=240, encoder_options=None):
+        self.output_dir = output_dir
+        self.fps = fps
+        self.codec = codec
+        self.encoder_options = encoder_options or {}
+        self.segment_frames = segment_frames
+        self.segment_index = 0
+        self.frame_count = 0
+        self._writer = None
+        self._segment_path = None
+        self._list_path = os.path.join(output_dir, 'segments.txt')
+        os.makedirs(output_dir, exist_ok=True)
+        open(self._list_path, 'w').close()
+
+    def write(self, frame):
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._segment_path = os.path.join(self.output_dir, f'segment_{self.segment_index:05d}.avi')
+            self._writer = open_writer(self._segment_path, self.fps, (width, height), self.codec, **self.encoder_options)
+        self._writer.write(frame)
+        self.frame_count += 1
+        if self.frame_count % self.segment_frames == 0:
+            self.close_segment()
+
+    def close_segment(self):
+        if self._writer is None:
+            return
+        self._writer.release()
+        self._writer = None
+        with open(self._list_path, 'a', encoding='utf-8') as f:
+            f.write(f"file '{os.path.basename(self._segment_path)}'\n")
+        print(f"分段已完成: {self._segment_path}")
+        self.segment_index += 1
+
+    def release(self):
+        self.close_segment()
+
+
+def watch_session(image_folder, log_path, output_dir, crop_area, xlim, ylim, sheet_name=None, fps=24,
+                  segment_frames=240, poll_interval=1.0, idle_timeout=None, window_length=37, polyorder=2,
+                  codec='XVID', encoder_options=None):
+    """实时预览：监视图像文件夹和仪器日志，按时间对齐后把合成帧追加到分段视频
+
+    每张新图像按文件名时刻对应到日志中不晚于该时刻的最后一行，日志尚未写到该时刻
+    或平滑值尚未确定时图像先排队。日志的 Time(Sec) 列为 "HH:MM:SS fff" 格式的时刻。
+    idle_timeout 秒内没有新数据时结束；为 None 时一直运行到 Ctrl+C。
+    codec、encoder_options 用于分段输出（FourCC 或 x264/x265/ffv1），见 insitu.encoder.open_writer。
+    只有 CSV 日志按行增量读取，其他格式每次修改后整表重读，见 LogTailer。
+    """
+    images = FolderTailer(image_folder)
+    log = LogTailer(log_path, sheet_name)
+    if not log.is_csv:
+        print(f"Warning: {log_path} 不是 CSV，每次更新都会整表重读，长时间采集请改用 CSV 日志")
+    writer = SegmentedVideoWriter(output_dir, fps, codec, segment_frames, encoder_options)
+    renderer = StressStrainRenderer(xlim, ylim)
+    epsilon_smoother = StreamingSavgol(window_length, polyorder)
+    sigma_smoother = StreamingSavgol(window_length, polyorder)
+
+    # 日志和待写图像都按块追加，避免每次轮询重新拼接全部历史数据
+    log_times = GrowableArray()
+    smoothed_epsilon = GrowableArray()
+    smoothed_sigma = GrowableArray()
+    pending_names = GrowableArray(dtype=object)
+    pending_seconds = GrowableArray()
+    frame_size = None
+    compositor = None
+    drawn = 0
+    last_activity = time.time()
+
+    def emit(finished):
+        """写出已能对齐的排队图像"""
+        nonlocal frame_size, compositor, drawn
+        names, seconds = pending_names.values, pending_seconds.values
+        times, epsilon, sigma = log_times.values, smoothed_epsilon.values, smoothed_sigma.values
+        indices = np.searchsorted(times, seconds, side='right') - 1
+        # 日志尚未覆盖到图像时刻、或平滑值未确定的图像留待下次
+        if finished:
+            ready = names.size
+        else:
+            covered = (times.size > 0) & (seconds < (times[-1] if times.size else -np.inf))
+            ready = int(np.argmin(np.append(covered & (indices < epsilon.size), False)))
+
+        for name, index in zip(names[:ready], indices[:ready]):
+            index = min(index, epsilon.size - 1)
+            if index >= drawn:
+                renderer.add_points(epsilon[drawn:index + 1], sigma[drawn:index + 1])
+                drawn = index + 1
+
+            if frame_size is None:
+                first = cv2.imread(os.path.join(image_folder, name))
+                if first is None:
+                    continue
+                frame_size = (first.shape[1], first.shape[0])
+                compositor = InsetCompositor(frame_size, renderer.frame_size)
+            frame = load_frame(os.path.join(image_folder, name), crop_area, frame_size)
+            if frame is None:
+                print(f"Warning: Unable to read image {name}. Skipping...")
+                continue
+            writer.write(compositor.compose(frame, renderer.frame()))
+        pending_names.consume(ready)
+        pending_seconds.consume(ready)
+
+    try:
+        while True:
+            new_rows = log.poll()
+            if new_rows is not None:
+                times = parse_time_seconds(new_rows['Time(Sec)'])
+                valid = ~np.isnan(times)
+                # 时刻偶有回退时按单调不减处理，保证 searchsorted 可用
+                times = times[valid]
+                if len(log_times):
+                    times = np.maximum(times, log_times.values[-1])
+                log_times.append(np.maximum.accumulate(times))
+                epsilon = new_rows['ε (%)'].to_numpy(dtype=float)[valid]
+                sigma = new_rows['σ (MPa)'].to_numpy(dtype=float)[valid]
+                smoothed_epsilon.append(epsilon_smoother.push(epsilon))
+                smoothed_sigma.append(sigma_smoother.push(sigma))
+
+            names, seconds = images.poll()
+            pending_names.append(names)
+            pending_seconds.append(seconds)
+
+            if new_rows is not None or names.size:
+                last_activity = time.time()
+            elif idle_timeout is not None and time.time() - last_activity > idle_timeout:
+                break
+
+            emit(finished=False)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("收到中断，正在写出剩余帧...")
+    finally:
+        # 采集结束：取回末端平滑值，剩余图像全部写出
+        smoothed_epsilon.append(epsilon_smoother.finish())
+        smoothed_sigma.append(sigma_smoother.finish())
+        if len(smoothed_epsilon):
+            emit(finished=True)
+        writer.release()
+        print(f"实时预览已保存至 {output_dir}，共 {writer.frame_count} 帧")
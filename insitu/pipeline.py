@@ -0,0 +1,70 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from insitu.instrument import get_recorder
+
+
+def prefetch_map(func, items, workers=None, prefetch=None):
+    """用有界线程池提前并行执行 func，并按输入顺序逐个产出结果
+
+    cv2 的解码、缩放等操作会释放 GIL，线程池即可占满多核。最多同时有
+    prefetch 个任务在途，内存占用有上限；workers <= 1 时退化为串行。
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    if prefetch is None:
+        prefetch = workers * 4
+
+    items = iter(items)
+    pending = deque()
+    recorder = get_recorder()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= prefetch:
+                    break
+
+            while pending:
+                # 在途任务数，阶段结束时汇总为队列深度统计
+                recorder.gauge('prefetch_queue', len(pending))
+                result = pending.popleft().result()
+                # 取走一个结果就补交一个任务，保持预取深度
+                for item in items:
+                    pending.append(pool.submit(func, item))
+                    break
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class ThroughputMeter:
+    """统计处理帧数，通过 insitu.instrument 的记录器按 interval 节流显示进度和吞吐率（帧/秒）"""
+
+    def __init__(self, label, total=None, interval=5.0):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self.start = time.perf_counter()
+
+    def update(self, n=1):
+        self.count += n
+        get_recorder().progress(self.label, self.count, self.total, interval=self.interval)
+
+    def rate(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def report(self, now=None):
+        progress = f"{self.count}/{self.total}" if self.total else f"{self.count}"
+        print(f"{self.label}: {progress} frames, {self.rate(now):.1f} frames/s")
+        get_recorder().emit('throughput', name=self.label, count=self.count, total=self.total, rate=self.rate(now))
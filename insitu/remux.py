@@ -0,0 +1,169 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+from fractions import Fraction
+
+import numpy as np
+from insitu.encoder import ffmpeg_executable
+
+
+def ffmpeg_available():
+    """ffmpeg（PATH 或 imageio-ffmpeg）与 ffprobe（PATH）是否都可用"""
+    return ffmpeg_executable() is not None and shutil.which('ffprobe') is not None
+
+
+def _run(args):
+    subprocess.run([ffmpeg_executable(), '-v', 'error', '-y'] + args, check=True)
+
+
+def probe_keyframes(video_path):
+    """读取视频流各数据包的关键帧标记（不解码像素），返回关键帧序号和总帧数"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=flags', '-of', 'csv=p=0', video_path],
+        check=True, capture_output=True, text=True)
+    flags = [line for line in result.stdout.splitlines() if line.strip()]
+    keyframes = np.flatnonzero([flag.startswith('K') for flag in flags])
+    return keyframes, len(flags)
+
+
+# 拆分点所在 GOP 按源视频的编码器重新编码，才能与流复制的前后片段直接拼接
+REENCODE_ARGS = {
+    'mpeg4': ('-c:v', 'mpeg4', '-q:v', '2'),
+    'ffv1': ('-c:v', 'ffv1', '-level', '3'),
+}
+
+
+def probe_codec(video_path):
+    """读取视频流的编码器名称、FourCC 和像素格式"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'stream=codec_name,codec_tag_string,pix_fmt', '-of', 'default=nw=1', video_path],
+        check=True, capture_output=True, text=True)
+    fields = dict(line.split('=', 1) for line in result.stdout.splitlines() if '=' in line)
+    return fields.get('codec_name'), fields.get('codec_tag_string'), fields.get('pix_fmt')
+
+
+def reencode_args_for(video_path):
+    """返回与源视频编码一致的重新编码参数；编码器不在 REENCODE_ARGS 中时返回 None
+
+    H.264/H.265 等重新编码后参数集与原片段不同，按流复制拼接的结果不可靠，因此不支持。
+    """
+    codec, tag, pix_fmt = probe_codec(video_path)
+    if codec not in REENCODE_ARGS:
+        return None
+    args = REENCODE_ARGS[codec]
+    if tag and tag.isalnum():
+        args += ('-vtag', tag)
+    if pix_fmt:
+        args += ('-pix_fmt', pix_fmt)
+    return args
+
+
+def retime_avi(input_video_path, output_video_path, new_fps):
+    """直接改写 AVI 头部中的帧率（avih 与视频流 strh），不解码也不重新编码"""
+    if os.path.abspath(input_video_path) != os.path.abspath(output_video_path):
+        shutil.copyfile(input_video_path, output_video_path)
+
+    rate = Fraction(new_fps).limit_denominator(10000)
+    patched = False
+    with open(output_video_path, 'r+b') as f:
+        riff, _, form = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or form != b'AVI ':
+            raise ValueError(f"不是 AVI 文件: {input_video_path}")
+
+        list_id, list_size, list_type = struct.unpack('<4sI4s', f.read(12))
+        if list_id != b'LIST' or list_type != b'hdrl':
+            raise ValueError(f"AVI 头部缺少 hdrl: {input_video_path}")
+
+        # 遍历 hdrl 及其中的 strl 列表，子块按偶数字节对齐
+        pos, end = f.tell(), f.tell() + list_size - 4
+        while pos + 8 <= end:
+            f.seek(pos)
+            chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+            data_start = pos + 8
+            if chunk_id == b'avih':
+                f.seek(data_start)
+                f.write(struct.pack('<I', round(1e6 / new_fps)))
+            elif chunk_id == b'LIST' and f.read(4) == b'strl':
+                # 进入 strl，继续遍历其子块
+                pos = data_start + 4
+                continue
+            elif chunk_id == b'strh' and f.read(4) == b'vids':
+                f.seek(data_start + 20)
+                f.write(struct.pack('<II', rate.denominator, rate.numerator))
+                patched = True
+            pos = data_start + chunk_size + (chunk_size & 1)
+
+    if not patched:
+        raise ValueError(f"AVI 头部中没有视频流: {input_video_path}")
+
+
+def _concat(pieces, output_path, workdir):
+    """用 concat 分离器按流复制拼接若干片段"""
+    pieces = [piece for piece in pieces if piece is not None]
+    if len(pieces) == 1:
+        shutil.move(pieces[0], output_path)
+        return
+    list_path = os.path.join(workdir, os.path.basename(output_path) + '.txt')
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for piece in pieces:
+            f.write(f"file '{piece}'\n")
+    _run(['-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output_path])
+
+
+def split_video_stream_copy(video_path, split_frame, output_path1, output_path2, reencode_args=None):
+    """按帧序号拆分视频，关键帧处直接流复制，只重新编码拆分点所在的 GOP
+
+    第一段包含 [0, split_frame) 帧，第二段包含其余帧。reencode_args 为 None 时按源视频的
+    编码器选择（见 reencode_args_for），源编码器不支持时抛出 ValueError。
+    """
+    keyframes, frame_count = probe_keyframes(video_path)
+    if not 0 < split_frame < frame_count:
+        raise ValueError(f"拆分帧 {split_frame} 超出范围 (0, {frame_count})")
+
+    gop_start = keyframes[np.searchsorted(keyframes, split_frame, side='right') - 1]
+    # gop_end 为 split_frame 之后的下一个关键帧；split_frame 本身是关键帧时也不能与 gop_start 相同
+    next_index = np.searchsorted(keyframes, split_frame, side='right')
+    gop_end = keyframes[next_index] if next_index < len(keyframes) else frame_count
+
+    # 在关键帧处把视频切成 [0, gop_start)、[gop_start, gop_end)、[gop_end, 结尾) 三段
+    cuts = sorted({int(gop_start), int(gop_end)} - {0, frame_count})
+    ext = os.path.splitext(video_path)[1]
+    with tempfile.TemporaryDirectory() as workdir:
+        if cuts:
+            pattern = os.path.join(workdir, f'segment_%03d{ext}')
+            _run(['-i', video_path, '-map', '0:v', '-c', 'copy', '-f', 'segment',
+                  '-segment_frames', ','.join(map(str, cuts)), '-reset_timestamps', '1', pattern])
+            segments = sorted(os.path.join(workdir, name) for name in os.listdir(workdir)
+                              if name.startswith('segment_'))
+        else:
+            segments = [video_path]
+
+        boundaries = [0] + cuts + [frame_count]
+        head = segments[boundaries.index(gop_start) - 1] if gop_start > 0 else None
+        gop = segments[boundaries.index(gop_start)]
+        tail = segments[boundaries.index(gop_end)] if gop_end < frame_count else None
+
+        if gop_start == split_frame:
+            # 拆分点本身是关键帧，全部流复制
+            shutil.move(head, output_path1)
+            _concat([gop, tail], output_path2, workdir)
+            return
+
+        # 只解码拆分点所在的 GOP，并按源视频的编码器重新编码为前后两部分
+        if reencode_args is None:
+            reencode_args = reencode_args_for(video_path)
+            if reencode_args is None:
+                raise ValueError(f"不支持按流复制拆分该编码的视频: {video_path}")
+        gop_head = os.path.join(workdir, f'gop_head{ext}')
+        gop_tail = os.path.join(workdir, f'gop_tail{ext}')
+        offset = split_frame - gop_start
+        _run(['-i', gop, '-frames:v', str(offset)] + list(reencode_args) + [gop_head])
+        _run(['-i', gop, '-vf', f'select=gte(n\\,{offset}),setpts=N/FRAME_RATE/TB']
+             + list(reencode_args) + [gop_tail])
+
+        _concat([head, gop_head], output_path1, workdir)
+        _concat([gop_tail, tail], output_path2, workdir)
@@ -0,0 +1,74 @@
+import numpy as np
+import cv2
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class StressStrainRenderer:
+    """在常驻的 Agg 画布上增量绘制应力-应变曲线动画帧
+
+    静态部分（坐标轴、网格、标题）只绘制一次；历史点逐批画进缓存的背景，
+    每帧只恢复背景并重绘当前点和图例，因此单帧开销与已绘制的点数无关。
+    """
+
+    def __init__(self, xlim, ylim, frame_size=(640, 480), dpi=80,
+                 xlabel='ε (%)', ylabel='σ (MPa)', title='Stress-Strain Curve (Smoothed)'):
+        width, height = frame_size
+        self.frame_size = (width, height)
+        self.figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(111)
+
+        self.ax.set_xlim(xlim)
+        self.ax.set_ylim(ylim)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_title(title)
+        self.ax.grid()
+
+        # 动态图元设为 animated，整体 draw() 时不会被画进背景
+        self.trail, = self.ax.plot([], [], linestyle='none', marker='o', markersize=6,
+                                   color='blue', label='Previous Points', animated=True)
+        self.current, = self.ax.plot([], [], linestyle='none', marker='o', markersize=10,
+                                     color='red', label='Current Point', animated=True)
+        self.legend = self.ax.legend(handles=[self.trail, self.current], loc='lower right')
+        self.legend.set_animated(True)
+        self.figure.tight_layout()
+
+        self.canvas.draw()
+        self._trail_background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._current_point = None
+        self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+
+    def add_points(self, x, y):
+        """追加一个或一批数据点，最后一个点成为当前点，其余点并入历史轨迹"""
+        x = np.atleast_1d(np.asarray(x, dtype=float))
+        y = np.atleast_1d(np.asarray(y, dtype=float))
+        if x.size == 0:
+            return
+
+        trail_x, trail_y = x[:-1], y[:-1]
+        if self._current_point is not None:
+            trail_x = np.concatenate(([self._current_point[0]], trail_x))
+            trail_y = np.concatenate(([self._current_point[1]], trail_y))
+
+        # 只把新增的历史点画到缓存背景上，再重新截取背景
+        if trail_x.size:
+            self.canvas.restore_region(self._trail_background)
+            self.trail.set_data(trail_x, trail_y)
+            self.ax.draw_artist(self.trail)
+            self._trail_background = self.canvas.copy_from_bbox(self.ax.bbox)
+
+        self._current_point = (x[-1], y[-1])
+
+    def frame(self):
+        """返回当前画面的 BGR 图像，缓冲区在各帧之间复用"""
+        self.canvas.restore_region(self._trail_background)
+        if self._current_point is not None:
+            self.current.set_data([self._current_point[0]], [self._current_point[1]])
+            self.ax.draw_artist(self.current)
+        self.ax.draw_artist(self.legend)
+
+        rgba = np.asarray(self.canvas.buffer_rgba())
+        cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR, dst=self._bgr)
+        return self._bgr
@@ -0,0 +1,34 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 仓库根目录下各处理脚本的文件名（文件名含空格，不能直接 import）
+SCRIPT_FILES = {
+    'timestamps': 'Time Difference of  In-situ video.py',
+    'time_differences': 'Time Difference of displacement&load.py',
+    'animate': 'creatr the insitu data vedio.py',
+    'image_video': 'creative the insitu vedio.py',
+    'merge': 'merge the data and vedio.py',
+    'fit': 'fitting result calculate.py',
+}
+
+
+def load_script(key):
+    """按需导入仓库根目录下的处理脚本，返回模块对象（不会执行其 __main__ 部分）"""
+    module_name = f'insitu_script_{key}'
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, SCRIPT_FILES[key]))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -0,0 +1,82 @@
+import numpy as np
+from scipy.signal import savgol_coeffs, savgol_filter
+
+
+def fit_window(length, window_length=37, polyorder=2):
+    """取不超过数据长度的最大奇数窗口；数据过短无法拟合时返回 None"""
+    window = min(window_length, length)
+    if window % 2 == 0:
+        window -= 1
+    if window <= polyorder:
+        return None
+    return window
+
+
+def savgol_smooth(values, window_length=37, polyorder=2):
+    """整段 Savitzky-Golay 平滑，窗口自动缩小为不超过数据长度的奇数"""
+    values = np.asarray(values, dtype=float)
+    window = fit_window(values.size, window_length, polyorder)
+    if window is None:
+        return values.copy()
+    return savgol_filter(values, window, polyorder)
+
+
+def _fit_edge(window_values, positions, polyorder):
+    # 与 savgol_filter(mode='interp') 相同：对端部整窗做多项式拟合后在端点处求值
+    coeffs = np.polyfit(np.arange(window_values.size), window_values, polyorder)
+    return np.polyval(coeffs, positions)
+
+
+class StreamingSavgol:
+    """分块流式 Savitzky-Golay 平滑，结果与对整段数据调用 savgol_smooth 相同
+
+    每次 push 一块数据，返回已能确定的平滑值；只保留最近一个窗口的样本，
+    内存占用与数据总长度无关。数据全部送入后调用 finish 取回末端的平滑值。
+    """
+
+    def __init__(self, window_length=37, polyorder=2):
+        if window_length % 2 == 0 or window_length <= polyorder:
+            raise ValueError("window_length 必须为大于 polyorder 的奇数")
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.half = window_length // 2
+        self.coeffs = savgol_coeffs(window_length, polyorder)
+        self.received = 0
+        self.emitted = 0
+        self._tail = np.empty(0)
+
+    def push(self, values):
+        values = np.asarray(values, dtype=float)
+        buffer = np.concatenate((self._tail, values))
+        buffer_start = self.received - self._tail.size
+        self.received += values.size
+
+        if self.received < self.window_length:
+            self._tail = buffer
+            return np.empty(0)
+
+        outputs = []
+        if self.emitted == 0:
+            # 起始端的 half 个点用第一个完整窗口拟合
+            outputs.append(_fit_edge(buffer[:self.window_length], np.arange(self.half), self.polyorder))
+            self.emitted = self.half
+
+        # 中间部分为定长卷积，buffer 中第 j 个有效输出对应中心点 buffer_start + half + j
+        interior = np.convolve(buffer, self.coeffs, mode='valid')
+        first = self.emitted - (buffer_start + self.half)
+        outputs.append(interior[first:])
+        self.emitted += interior.size - first
+
+        self._tail = buffer[-self.window_length:]
+        return np.concatenate(outputs)
+
+    def finish(self):
+        """数据结束，返回剩余的平滑值（末端 half 个点用最后一个窗口拟合）"""
+        if self.received < self.window_length:
+            # 数据不足一个窗口时与整段平滑一致，缩小窗口处理
+            result = savgol_smooth(self._tail, self.window_length, self.polyorder)
+        else:
+            positions = np.arange(self.window_length - self.half, self.window_length)
+            result = _fit_edge(self._tail, positions, self.polyorder)
+        self.emitted = self.received
+        return result
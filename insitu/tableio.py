@@ -0,0 +1,157 @@
+import argparse
+import os
+
+import pandas as pd
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+COLUMNAR_EXTENSIONS = ('.parquet', '.pq', '.feather', '.arrow', '.csv')
+
+
+def table_path(path, sheet_name=None, per_sheet=False):
+    """列式格式一个文件只存一张表，工作表可对应同目录下的 <名称>_<工作表><扩展名>
+
+    只有 per_sheet 为真或该文件已存在（如 convert_workbook 转换出的文件）时才使用工作表文件，
+    否则直接使用 path，单表的 CSV/Parquet/Feather 不受默认工作表名影响。
+    """
+    stem, ext = os.path.splitext(path)
+    if sheet_name is None or ext.lower() in EXCEL_EXTENSIONS:
+        return path
+    sheet_path = f"{stem}_{sheet_name}{ext}"
+    return sheet_path if per_sheet or os.path.exists(sheet_path) else path
+
+
+def read_table(path, sheet_name=None, columns=None):
+    """按扩展名读取表格；Parquet/Feather/CSV 使用内存映射，Excel 按工作表读取
+
+    sheet_name 为 None 时 Excel 读取第一个工作表。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        return pd.read_excel(path, sheet_name=0 if sheet_name is None else sheet_name, usecols=columns)
+
+    path = table_path(path, sheet_name)
+    if ext in ('.parquet', '.pq'):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    if ext in ('.feather', '.arrow'):
+        # pandas.read_feather 不接受 memory_map，直接用 pyarrow 以内存映射方式读取
+        import pyarrow.feather as feather
+
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    if ext == '.csv':
+        return pd.read_csv(path, usecols=columns, memory_map=True)
+    raise ValueError(f"不支持的表格格式: {path}")
+
+
+def write_table(df, path, sheet_name=None, replace_sheet=False, per_sheet=False):
+    """按扩展名写出表格，返回实际写出的文件路径
+
+    Excel 默认覆盖整个工作簿；replace_sheet 为真且文件已存在时只替换 sheet_name 工作表。
+    列式格式按 table_path 决定是否写入 <名称>_<工作表> 文件。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        sheet_name = 'Sheet1' if sheet_name is None else sheet_name
+        if replace_sheet and os.path.exists(path):
+            with pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        else:
+            with pd.ExcelWriter(path, engine='openpyxl', mode='w') as writer:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        return path
+
+    path = table_path(path, sheet_name, per_sheet)
+    if ext in ('.parquet', '.pq'):
+        df.to_parquet(path, index=False)
+    elif ext in ('.feather', '.arrow'):
+        df.reset_index(drop=True).to_feather(path)
+    elif ext == '.csv':
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"不支持的表格格式: {path}")
+    return path
+
+
+def iter_table_chunks(path, sheet_name=None, columns=None, chunksize=100000):
+    """按块读取表格，CSV 与 Parquet 逐块流式读取，其他格式整表读取后切块"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        yield from pd.read_csv(table_path(path, sheet_name), usecols=columns, chunksize=chunksize)
+        return
+    if ext in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(table_path(path, sheet_name), memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    df = read_table(path, sheet_name, columns)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+class TableAppender:
+    """逐块追加写出表格，CSV 与 Parquet 流式写入，其他格式在 close 时一次写出"""
+
+    def __init__(self, path, sheet_name=None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.ext = os.path.splitext(path)[1].lower()
+        self.output_path = table_path(path, sheet_name)
+        self._writer = None
+        self._chunks = []
+        self._header_written = False
+
+    def write(self, df):
+        if self.ext == '.csv':
+            df.to_csv(self.output_path, mode='a' if self._header_written else 'w',
+                      header=not self._header_written, index=False)
+            self._header_written = True
+        elif self.ext in ('.parquet', '.pq'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            self._chunks.append(df)
+
+    def close(self):
+        """结束写入，返回实际写出的文件路径"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        elif self._chunks:
+            write_table(pd.concat(self._chunks, ignore_index=True), self.path, self.sheet_name,
+                        per_sheet=self.output_path != self.path)
+            self._chunks = []
+        return self.output_path
+
+
+def convert_workbook(workbook_path, ext='.parquet', output_dir=None):
+    """把 Excel 工作簿的每个工作表转换为列式文件，返回写出的文件路径"""
+    stem = os.path.splitext(os.path.basename(workbook_path))[0]
+    output_dir = output_dir or os.path.dirname(workbook_path)
+    target = os.path.join(output_dir, stem + ext)
+
+    sheets = pd.read_excel(workbook_path, sheet_name=None)
+    written = []
+    for sheet_name, df in sheets.items():
+        # 列名统一转为字符串，Parquet/Feather 要求列名为字符串
+        df.columns = [str(column) for column in df.columns]
+        written.append(write_table(df, target, sheet_name=sheet_name, per_sheet=True))
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 Excel 工作簿转换为 Parquet/Feather/CSV")
+    parser.add_argument('workbooks', nargs='+')
+    parser.add_argument('--format', default='.parquet', choices=COLUMNAR_EXTENSIONS)
+    parser.add_argument('--output-dir')
+    args = parser.parse_args()
+
+    for workbook in args.workbooks:
+        for path in convert_workbook(workbook, args.format, args.output_dir):
+            print(f"已写出 {path}")
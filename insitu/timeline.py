@@ -0,0 +1,161 @@
+import numpy as np
+from insitu.timeparse import parse_time_seconds, parse_filename_seconds
+
+
+def frame_schedule(timestamps, fps, duration=None):
+    """按固定帧率在虚拟时间轴上采样，返回每个输出帧应显示的数据索引
+
+    timestamps 为各数据点的播放时刻（秒，已按 speed_factor 缩放）。两个数据点
+    间隔超过一帧时重复前一点，一帧内有多个数据点时只显示最后一个，
+    使视频的播放时长与实验时钟一致。
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    if timestamps.size == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # 时间戳偶有回退时按单调不减处理
+    timestamps = np.maximum.accumulate(timestamps)
+    start = timestamps[0]
+    if duration is None:
+        duration = timestamps[-1] - start
+
+    frame_count = int(np.floor(duration * fps + 1e-9)) + 1
+    frame_times = start + np.arange(frame_count) / fps
+    indices = np.searchsorted(timestamps, frame_times, side='right') - 1
+    return np.clip(indices, 0, timestamps.size - 1)
+
+
+class TimeAxis:
+    """数据行的播放时间轴，以 float64 秒表示，构建和查询均为线性时间
+
+    seconds[i] 为第 i 个有效数据点相对起点、按 speed_factor 加速后的播放时刻，
+    valid_indices 为这些数据点在原始表格中的行号。
+    """
+
+    def __init__(self, seconds, valid_indices, speed_factor=1):
+        self.seconds = np.asarray(seconds, dtype=float)
+        self.valid_indices = np.asarray(valid_indices, dtype=np.intp)
+        self.speed_factor = speed_factor
+
+    @classmethod
+    def from_intervals(cls, intervals, speed_factor=1):
+        """Time(Sec) 列记录的是逐行时长，第 i 点的时刻为前 i 个时长之和"""
+        intervals = np.asarray(intervals, dtype=float)
+        valid_indices = np.flatnonzero(~np.isnan(intervals))
+        elapsed = np.zeros(valid_indices.size)
+        np.cumsum(intervals[valid_indices][:-1], out=elapsed[1:])
+        return cls(elapsed / speed_factor, valid_indices, speed_factor)
+
+    @classmethod
+    def from_timestamps(cls, timestamps, speed_factor=1):
+        """绝对时刻（如文件名中的时间），以第一个有效时刻为起点"""
+        timestamps = np.asarray(timestamps, dtype=float)
+        valid_indices = np.flatnonzero(~np.isnan(timestamps))
+        valid = timestamps[valid_indices]
+        elapsed = valid - valid[0] if valid.size else valid
+        return cls(elapsed / speed_factor, valid_indices, speed_factor)
+
+    @classmethod
+    def from_column(cls, column, speed_factor=1):
+        """按列名选择解析方式：'Time(Sec)' 为时长字符串，'File name' 为图像文件名"""
+        if column.name == 'Time(Sec)':
+            axis = cls.from_intervals(parse_time_seconds(column), speed_factor)
+        elif column.name == 'File name':
+            axis = cls.from_timestamps(parse_filename_seconds(column), speed_factor)
+        else:
+            raise ValueError(f"不支持的首列类型: {column.name}")
+
+        if axis.valid_indices.size == 0:
+            raise ValueError(f"没有有效的 {column.name} 时间数据")
+        return axis
+
+    def __len__(self):
+        return self.seconds.size
+
+    @property
+    def duration(self):
+        return self.seconds[-1] - self.seconds[0] if self.seconds.size else 0.0
+
+    def frame_indices(self, fps):
+        """以 fps 采样时间轴，返回每个视频帧对应的数据点序号"""
+        return frame_schedule(self.seconds, fps)
+
+    def frame_times(self, fps):
+        """以 fps 采样时各视频帧的播放时刻（秒）"""
+        return np.arange(self.frame_indices(fps).size) / fps
+
+
+class StreamingTimeAxis:
+    """分块构建 TimeAxis：逐块送入原始时间列，时刻在块之间连续累积"""
+
+    def __init__(self, column_name, speed_factor=1):
+        if column_name not in ('Time(Sec)', 'File name'):
+            raise ValueError(f"不支持的首列类型: {column_name}")
+        self.column_name = column_name
+        self.speed_factor = speed_factor
+        self.count = 0
+        self._elapsed = 0.0
+        self._base = None
+
+    def push(self, column):
+        """返回本块的 TimeAxis，valid_indices 为块内行号"""
+        if self.column_name == 'Time(Sec)':
+            intervals = parse_time_seconds(column)
+            axis = TimeAxis.from_intervals(intervals, self.speed_factor)
+            axis.seconds += self._elapsed
+            self._elapsed += np.nansum(intervals) / self.speed_factor
+        else:
+            timestamps = parse_filename_seconds(column)
+            axis = TimeAxis.from_timestamps(timestamps, self.speed_factor)
+            if axis.seconds.size:
+                if self._base is None:
+                    self._base = timestamps[axis.valid_indices[0]]
+                axis.seconds += (timestamps[axis.valid_indices[0]] - self._base) / self.speed_factor
+        self.count += len(axis)
+        return axis
+
+
+class FrameClock:
+    """frame_schedule 的增量版本：逐块送入数据时刻，返回已能确定的帧对应的数据序号
+
+    某帧时刻之后出现了更晚的数据点时，该帧显示的数据点才能确定。
+    """
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.frame_count = 0
+        self.start = None
+        self._latest = None
+
+    def push(self, timestamps, offset):
+        """timestamps 为序号 offset 起的一段数据时刻，返回新确定的帧的数据序号"""
+        timestamps = np.asarray(timestamps, dtype=float)
+        if timestamps.size == 0:
+            return np.empty(0, dtype=np.intp)
+        if self.start is None:
+            self.start = timestamps[0]
+            self._latest = timestamps[0]
+        timestamps = np.maximum.accumulate(np.maximum(timestamps, self._latest))
+        self._latest = timestamps[-1]
+
+        # 只输出时刻严格早于当前最新数据点的帧
+        ready = int(np.ceil((self._latest - self.start) * self.fps - 1e-9))
+        return self._schedule(timestamps, offset, ready)
+
+    def finish(self, offset):
+        """数据结束（共 offset 个数据点），输出直到最后一个数据点时刻为止的剩余帧"""
+        if self.start is None:
+            return np.empty(0, dtype=np.intp)
+        ready = int(np.floor((self._latest - self.start) * self.fps + 1e-9)) + 1
+        # 剩余帧均显示最后一个数据点
+        count = max(ready - self.frame_count, 0)
+        self.frame_count = max(ready, self.frame_count)
+        return np.full(count, offset - 1, dtype=np.intp)
+
+    def _schedule(self, timestamps, offset, ready):
+        if ready <= self.frame_count:
+            return np.empty(0, dtype=np.intp)
+        frame_times = self.start + np.arange(self.frame_count, ready) / self.fps
+        self.frame_count = ready
+        # 早于本块第一个点的帧落在上一块最后一个点 (offset - 1)
+        return np.searchsorted(timestamps, frame_times, side='right') - 1 + offset
@@ -0,0 +1,32 @@
+import numpy as np
+
+# "HH:MM:SS fff"、"HH:MM:SS"、"HH:MM:SS.ffffff" 以及省略小时的 "MM:SS[.fff]"
+TIME_PATTERN = r'^\s*(?:(?P<h>\d{1,2}):)?(?P<m>\d{1,2}):(?P<s>\d{1,2})(?:[.\s]\s*(?P<f>\d{1,6}))?\s*$'
+FILENAME_PATTERN = r'^image-(?P<h>\d{2})(?P<m>\d{2})(?P<s>\d{2})_(?P<f>\d{3})\.jpg$'
+
+
+def _extract_seconds(values, pattern):
+    # pandas 导入较慢，只在解析时导入，查询文件夹索引等操作不受影响
+    import pandas as pd
+
+    parts = pd.Series(values).astype(str).str.extract(pattern)
+    hours = pd.to_numeric(parts['h']).fillna(0).to_numpy(dtype=float)
+    minutes = pd.to_numeric(parts['m']).to_numpy(dtype=float)
+    seconds = pd.to_numeric(parts['s']).to_numpy(dtype=float)
+    # 小数部分按小数位解释，与 strptime 的 %f 一致："5" 为 0.5 秒，"123" 为 0.123 秒
+    fraction = pd.to_numeric('0.' + parts['f'].fillna('0')).to_numpy(dtype=float)
+
+    total = hours * 3600 + minutes * 60 + seconds + fraction
+    in_range = (hours < 24) & (minutes < 60) & (seconds < 62)
+    total[~in_range] = np.nan
+    return total
+
+
+def parse_time_seconds(values):
+    """向量化解析时间字符串为当天总秒数（float64 数组），无法解析的行为 NaN"""
+    return _extract_seconds(values, TIME_PATTERN)
+
+
+def parse_filename_seconds(filenames):
+    """向量化解析 image-HHMMSS_mmm.jpg 文件名为当天总秒数，不匹配的行为 NaN"""
+    return _extract_seconds(filenames, FILENAME_PATTERN)
@@ -0,0 +1,25 @@
+import cv2
+
+
+class FrameTransform:
+    """裁剪 + 缩放的逐帧变换，裁剪区域、输出尺寸和插值方式在创建时确定一次
+
+    crop_area 为 (x, y, w, h)，output_size 为输出 (宽, 高)，None 时保持裁剪尺寸，
+    此时只返回切片视图，不复制也不缩放。需要缩放时对切片视图做一次 cv2.resize
+    （实测比预先计算映射表的 cv2.remap 快约一倍）。
+    """
+
+    def __init__(self, crop_area, output_size=None, interpolation=cv2.INTER_LINEAR):
+        x, y, w, h = crop_area
+        self.crop_area = (x, y, w, h)
+        self.output_size = tuple(output_size) if output_size is not None else (w, h)
+        self.interpolation = interpolation
+        self._rows = slice(y, y + h)
+        self._cols = slice(x, x + w)
+        self._resize = self.output_size != (w, h)
+
+    def __call__(self, img):
+        crop = img[self._rows, self._cols]
+        if not self._resize:
+            return crop
+        return cv2.resize(crop, self.output_size, interpolation=self.interpolation)
@@ -0,0 +1,19 @@
+from insitu.live import watch_session
+
+if __name__ == "__main__":
+    # 采集过程中实时生成预览：监视图像文件夹和仪器日志（CSV 可按行追加读取）
+    image_folder = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\2025_03-09 161526"
+    log_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\20250309_raw.csv"
+    output_dir = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\live_preview"
+
+    crop_area = (15, 92, 935, 935)  # 裁剪区域 (x起始像素, y起始像素, x像素宽度, y像素高度)
+    xlim = (0, 10)  # 设置横轴范围
+    ylim = (0, 300)  # 设置纵轴范围
+    codec = 'XVID'  # OpenCV FourCC；也可用 'x264'、'x265' 或无损的 'ffv1'（通过 ffmpeg 管道编码）
+    encoder_options = None  # ffmpeg 编码参数，如 {'preset': 'veryfast', 'crf': 20, 'threads': 8}
+
+    # 每段 240 帧（24 fps 下 10 秒），已完成的分段列在 output_dir\segments.txt 中，可直接播放
+    # idle_timeout 秒内没有新图像和新数据时自动结束，None 表示一直运行到 Ctrl+C
+    watch_session(image_folder, log_path, output_dir, crop_area, xlim, ylim,
+                  fps=24, segment_frames=240, poll_interval=1.0, idle_timeout=None,
+                  codec=codec, encoder_options=encoder_options)
@@ -1,7 +1,10 @@
 import cv2
-import os
-import numpy as np
-from moviepy.editor import VideoFileClip, clips_array, CompositeVideoClip
+from insitu.remux import ffmpeg_available, reencode_args_for, retime_avi, split_video_stream_copy
+from insitu.compositor import overlay_videos, overlay_aligned_data, concatenate_videos
+from insitu.encoder import open_writer
+from insitu.folderindex import ImageFolderIndex
+from insitu.framegraph import read_frame_list, write_frame_list
+from insitu.instrument import instrumented
 
 
 def get_frame_count(video_path):
@@ -11,11 +14,54 @@ def get_frame_count(video_path):
     return count
 
 def get_frame_at_image(image_name, image_folder):
-    images = [img for img in os.listdir(image_folder) if img.endswith(".jpg")]
-    images.sort()
-    if image_name in images:
-        return images.index(image_name)
-    return -1
+    # 文件夹只扫描一次，结果缓存在进程内和文件夹的索引文件中
+    return ImageFolderIndex.open(image_folder).index_of(image_name)
+
+def get_video_frame_names(video_path, image_folder):
+    """视频各帧对应的图像文件名：优先使用生成视频时写出的帧列表（不含读取失败的图像），
+    没有帧列表时假定文件夹中的图像全部写入了视频"""
+    names = read_frame_list(video_path)
+    return names if names is not None else ImageFolderIndex.open(image_folder).names
+
+def align_data_to_frames(image_folder, start_frame, input_file_path, sheet_name='input_data', method='nearest',
+                         end_frame=None, frame_names=None):
+    """按时间戳把 start_frame 起的每个 TEM 帧对齐到力学数据点，返回 (数据序号, 平滑 ε, 平滑 σ)
+
+    'Time(Sec)' 为逐行时长，以 start_frame 对应图像的时刻作为数据起点；
+    'File name' 直接使用文件名中的时刻。
+    frame_names 为视频各帧对应的图像文件名（见 get_video_frame_names），为 None 时使用文件夹中的全部图像；
+    start_frame、end_frame 均为视频中的帧序号。给定 end_frame 时，其后的帧保持 end_frame 对应的数据点。
+    """
+    # 按需导入，只查询帧数、帧率等轻量操作时不加载 pandas/scipy
+    from insitu.alignment import align_frames
+    from insitu.smoothing import savgol_smooth
+    from insitu.tableio import read_table
+    from insitu.timeline import TimeAxis
+    from insitu.timeparse import parse_filename_seconds
+
+    data = read_table(input_file_path, sheet_name=sheet_name)
+    first_column = data.columns[0]
+    time_axis = TimeAxis.from_column(data[first_column])
+    valid_data = data.iloc[time_axis.valid_indices]
+
+    if frame_names is None:
+        frame_seconds = ImageFolderIndex.open(image_folder).timestamps[start_frame:]
+    else:
+        frame_seconds = parse_filename_seconds(frame_names[start_frame:])
+    if first_column == 'File name':
+        anchor = parse_filename_seconds(data[first_column])[time_axis.valid_indices[0]]
+    else:
+        anchor = frame_seconds[0]
+
+    alignment = align_frames(frame_seconds, time_axis.seconds + anchor, method)
+    indices = alignment.indices
+    if end_frame is not None and 0 <= end_frame - start_frame < len(indices) - 1:
+        # 数据在结束图像处截止，之后的帧不再推进
+        indices = indices.copy()
+        indices[end_frame - start_frame + 1:] = indices[end_frame - start_frame]
+    smoothed_epsilon = savgol_smooth(valid_data['ε (%)'])
+    smoothed_sigma = savgol_smooth(valid_data['σ (MPa)'])
+    return indices, smoothed_epsilon, smoothed_sigma
 
 def get_video_fps(video_path):
     cap = cv2.VideoCapture(video_path)
@@ -23,14 +69,19 @@ def get_video_fps(video_path):
     cap.release()
     return fps
 
-def adjust_video_speed(input_video_path, output_video_path, new_fps):
+@instrumented
+def adjust_video_speed(input_video_path, output_video_path, new_fps, remux=True, codec='XVID', encoder_options=None):
+    # AVI 只需改写头部帧率，不解码也不重新编码
+    if remux and input_video_path.lower().endswith('.avi') and output_video_path.lower().endswith('.avi'):
+        retime_avi(input_video_path, output_video_path, new_fps)
+        return
+
     cap = cv2.VideoCapture(input_video_path)
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     
     # 创建输出视频对象，使用新的帧率
-    out = cv2.VideoWriter(output_video_path, fourcc, new_fps, (frame_width, frame_height))
+    out = open_writer(output_video_path, new_fps, (frame_width, frame_height), codec, **(encoder_options or {}))
 
     while cap.isOpened():
         ret, frame = cap.read()
@@ -42,15 +93,23 @@ def adjust_video_speed(input_video_path, output_video_path, new_fps):
     cap.release()
     out.release()
 
-def split_video_at_frame(video_path, start_frame, output_path1, output_path2):
+@instrumented
+def split_video_at_frame(video_path, start_frame, output_path1, output_path2, remux=True, codec='XVID', encoder_options=None):
+    # 有 ffmpeg 时在关键帧处流复制，只按源视频的编码器重新编码拆分点所在的 GOP；
+    # 源视频为 H.264/H.265 等不能可靠拼接的编码时，退回下面按 codec、encoder_options 逐帧重新编码
+    if remux and ffmpeg_available():
+        reencode_args = reencode_args_for(video_path)
+        if reencode_args is not None:
+            split_video_stream_copy(video_path, start_frame, output_path1, output_path2, reencode_args)
+            return
+
     cap = cv2.VideoCapture(video_path)
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
     fps = get_video_fps(video_path)
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    out1 = cv2.VideoWriter(output_path1, fourcc, fps, (frame_width, frame_height))
-    out2 = cv2.VideoWriter(output_path2, fourcc, fps, (frame_width, frame_height))
+    out1 = open_writer(output_path1, fps, (frame_width, frame_height), codec, **(encoder_options or {}))
+    out2 = open_writer(output_path2, fps, (frame_width, frame_height), codec, **(encoder_options or {}))
 
     frame_count = 0
     while cap.isOpened():
@@ -70,6 +129,9 @@ def split_video_at_frame(video_path, start_frame, output_path1, output_path2):
     out2.release()
 
 def concatenate_videos_with_overlay(video1_path, video2_path, merged_video_path):
+    # moviepy.editor 导入很慢，只在使用 MoviePy 合成时导入
+    from moviepy.editor import VideoFileClip, CompositeVideoClip
+
     # video1 是背景视频（output_video_part2），video2 是叠加视频（adjusted_stress_video）
     video1 = VideoFileClip(video1_path)  # output_video_part2
     video2 = VideoFileClip(video2_path)  # adjusted_stress_video
@@ -106,6 +168,8 @@ def concatenate_videos_with_overlay(video1_path, video2_path, merged_video_path)
 
 
 def concatenate_videos_with_padding(video1_path, video2_path, merged_video_path):
+    from moviepy.editor import VideoFileClip, CompositeVideoClip
+
     video1 = VideoFileClip(video1_path)
     video2 = VideoFileClip(video2_path)
 
@@ -136,48 +200,99 @@ def concatenate_videos_with_padding(video1_path, video2_path, merged_video_path)
     )
 
 
+@instrumented
+def merge_session(image_folder, output_video_path, output_video_part1, output_video_part2, merged_video_part, final_merged_video_path,
+                  start_image, end_image, stress_video_path=None, adjusted_stress_video_path=None, input_file_path=None, xlim=None, ylim=None,
+                  split_in_image_stage=None, align_by_timestamp=True, use_moviepy=False, codec='x264', encoder_options=None,
+                  decimate=None):
+    """把 TEM 视频与应力-应变数据合并为最终视频，成功时返回 True
+
+    start_image、end_image 为数据开始、结束时刻对应的图像文件名。
+    align_by_timestamp=True 时按时间戳对齐并逐帧绘制小图，需要 input_file_path、xlim、ylim；
+    否则按帧率比例拉伸 stress_video_path 后叠加。
+    codec、encoder_options 用于合成输出（x264/x265/ffv1 或 FourCC），见 insitu.encoder.open_writer。
+    decimate 为 'minmax' 或 'lttb' 时按帧精简小图的轨迹点（仅 align_by_timestamp=True 时有效）。
+    split_in_image_stage 为 True 时直接使用图像转视频时按 split_image 输出的两段，为 False 时总是重新拆分，
+    为 None 时按两段的帧列表自动判断：两段由当前的 output_video_path 生成、且恰好在 start_image 处拆分时直接使用，
+    避免再次解码。
+    """
+    # 查找帧位置：按视频实际写入的帧计算，读取失败被跳过的图像不占帧序号
+    frame_names = get_video_frame_names(output_video_path, image_folder)
+    start_frame = frame_names.index(start_image) if start_image in frame_names else -1
+    end_frame = frame_names.index(end_image) if end_image in frame_names else -1
+
+    if start_frame == -1 or end_frame == -1:
+        print("无法找到指定的图像文件。")
+        return False
+
+    # 拆分output_video；图像转视频时已在同一遍解码中输出两段时直接使用
+    if split_in_image_stage is None:
+        # 两段必须由当前的 output_video 拆分而来：重新生成视频（如修改裁剪区域）后旧的两段不再可用
+        part1_names = read_frame_list(output_video_part1, source=output_video_path)
+        part2_names = read_frame_list(output_video_part2, source=output_video_path)
+        split_in_image_stage = (part1_names is not None and part2_names is not None
+                                and part1_names + part2_names == frame_names and part2_names[:1] == [start_image])
+    if split_in_image_stage:
+        print(f"使用已拆分的 {output_video_part1} 和 {output_video_part2}")
+    else:
+        split_video_at_frame(output_video_path, start_frame, output_video_part1, output_video_part2)
+        write_frame_list(output_video_part1, frame_names[:start_frame], source=output_video_path)
+        write_frame_list(output_video_part2, frame_names[start_frame:], source=output_video_path)
+
+    # align_by_timestamp=True 时按图像时间戳与数据时间对齐，逐帧绘制应力-应变小图，
+    # 不再假设帧间隔均匀、用帧率比例拉伸应力视频（相机掉帧、曝光时间变化时仍然同步）
+    if align_by_timestamp:
+        data_indices, smoothed_epsilon, smoothed_sigma = align_data_to_frames(image_folder, start_frame, input_file_path,
+                                                                              end_frame=end_frame, frame_names=frame_names)
+        overlay_aligned_data(output_video_part2, merged_video_part, data_indices, smoothed_epsilon, smoothed_sigma, xlim, ylim,
+                             codec=codec, encoder_options=encoder_options, decimate=decimate)
+    else:
+        # 通过OpenCV读取帧率
+        output_fps = get_video_fps(output_video_path) 
+
+        # 获取stress视频的帧数
+        stress_frame_count = get_frame_count(stress_video_path)
+
+        # 计算需要的速度
+        total_frames = end_frame - start_frame + 1
+        new_fps = (stress_frame_count/ total_frames) * output_fps
+
+        # 调整stress视频的速度
+        adjust_video_speed(stress_video_path, adjusted_stress_video_path, new_fps)
+
+        # 左右拼合output_video_part2和adjusted_stress_video
+        # use_moviepy=False 时使用逐帧流式的 OpenCV 合成器，内存占用恒定，速度远快于 MoviePy
+        if use_moviepy:
+            concatenate_videos_with_overlay(output_video_part2, adjusted_stress_video_path, merged_video_part)
+        else:
+            overlay_videos(output_video_part2, adjusted_stress_video_path, merged_video_part, codec=codec, encoder_options=encoder_options)
+
+    # 顺序拼合output_video_part1和merged_video_part
+    if use_moviepy:
+        concatenate_videos_with_padding(output_video_part1, merged_video_part, final_merged_video_path)
+    else:
+        concatenate_videos(output_video_part1, merged_video_part, final_merged_video_path, codec=codec, encoder_options=encoder_options)
+
+    print(f"合并视频已保存至 {final_merged_video_path}")
+    return True
+
+
 if __name__ == "__main__":
     # 路径设置
     image_folder = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\2025_03-09 161526"
     output_video_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\output_video_cropped_with_name.avi"
     stress_video_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\stress_strain_video.avi"
-    merged_video_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\merged_video.avi"
-
-    # 查找帧位置
-    start_frame = get_frame_at_image("image-161547_677.jpg", image_folder)
-    end_frame = get_frame_at_image("image-161815_682.jpg", image_folder)
-    
-    if start_frame == -1 or end_frame == -1:
-        print("无法找到指定的图像文件。")
-        exit()
+    input_file_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\20250309_input_data.xlsx"
 
-    # 通过OpenCV读取帧率
-    output_fps = get_video_fps(output_video_path) 
-    # 获取output_video的帧数 
-    output_frame_count = get_frame_count(output_video_path)
-    
-    # 拆分output_video
     output_video_part1 = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\output_video_part1.avi"
     output_video_part2 = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\output_video_part2.avi"
-    split_video_at_frame(output_video_path, start_frame, output_video_part1, output_video_part2)
-
-    # 获取stress视频的帧数
-    stress_frame_count = get_frame_count(stress_video_path)
-
-    # 计算需要的速度
-    total_frames = end_frame - start_frame + 1
-    new_fps = (stress_frame_count/ total_frames) * output_fps
-
-    # 调整stress视频的速度
     adjusted_stress_video_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\adjusted_stress_video.avi"
-    adjust_video_speed(stress_video_path, adjusted_stress_video_path, new_fps)
-
-    # 左右拼合output_video_part2和adjusted_stress_video
     merged_video_part = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\video\\merged_video_part.avi"
-    concatenate_videos_with_overlay(output_video_part2, adjusted_stress_video_path, merged_video_part)
-
-    # 顺序拼合output_video_part1和merged_video_part
     final_merged_video_path = r"E:\\Dr\\728-aluminum-alloy\\In-situ mechanics\\TEM\\20250309-Al-2.6Mg\\final_merged_video.avi"
-    concatenate_videos_with_padding(output_video_part1, merged_video_part, final_merged_video_path)
 
-    print(f"合并视频已保存至 {final_merged_video_path}")
\ No newline at end of file
+    xlim = (0, 10)  # 设置横轴范围
+    ylim = (0, 300)  # 设置纵轴范围
+
+    merge_session(image_folder, output_video_path, output_video_part1, output_video_part2, merged_video_part, final_merged_video_path,
+                  "image-161547_677.jpg", "image-161815_682.jpg", stress_video_path, adjusted_stress_video_path, input_file_path, xlim, ylim,
+                  align_by_timestamp=True, use_moviepy=False)
\ No newline at end of file
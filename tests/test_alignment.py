@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from insitu.alignment import align_frames
+
+# 数据时刻偶有回退（1 -> 0.5），按单调不减处理；帧时刻乱序，且有早于、晚于数据范围的帧和 NaN
+DATA_SECONDS = [0.0, 1.0, 0.5, 2.0, 3.0]
+FRAME_SECONDS = [2.6, -1.0, 0.9, 5.0, np.nan, 1.2]
+
+
+@pytest.mark.parametrize('method, tolerance, expected', [
+    ('nearest', None, [4, 0, 1, 4, -1, 2]),
+    ('previous', None, [3, -1, 0, 4, -1, 2]),
+    ('nearest', 0.5, [4, -1, 1, -1, -1, 2]),
+])
+def test_align_frames(method, tolerance, expected):
+    alignment = align_frames(FRAME_SECONDS, DATA_SECONDS, method, tolerance)
+    np.testing.assert_array_equal(alignment.indices, expected)
+    unmatched = np.asarray(expected) < 0
+    assert np.isnan(alignment.positions[unmatched]).all()
+    assert not np.isnan(alignment.positions[~unmatched]).any()
+    assert np.isnan(alignment.interpolate(np.arange(5.0))[unmatched]).all()
+
+
+def test_align_frames_offsets():
+    alignment = align_frames(FRAME_SECONDS, DATA_SECONDS)
+    np.testing.assert_allclose(alignment.offsets, [-0.4, -1.0, -0.1, 2.0, np.nan, 0.2])
+
+
+def test_align_frames_without_data():
+    alignment = align_frames(FRAME_SECONDS, [])
+    np.testing.assert_array_equal(alignment.indices, -1)
+    assert len(alignment) == len(FRAME_SECONDS)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from insitu.decimate import decimate_to_frames
+
+
+def test_minmax_keeps_bucket_extremes():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=1000)
+    x = np.arange(y.size, dtype=float)
+    frame_indices = np.array([-1, 99, 99, 349, 600, 999])
+    kept, mapped = decimate_to_frames(frame_indices, x, y, 'minmax')
+
+    for start, stop in [(0, 100), (100, 350), (350, 601), (601, 1000)]:
+        bucket = np.arange(start, stop)
+        expected = {start, stop - 1, start + int(np.argmin(y[bucket])), start + int(np.argmax(y[bucket]))}
+        assert set(kept[(kept >= start) & (kept < stop)]) == expected
+
+    # 每帧仍显示原来的当前点
+    np.testing.assert_array_equal(mapped[0], -1)
+    np.testing.assert_array_equal(kept[mapped[1:]], frame_indices[1:])
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_short_input_unchanged(method):
+    y = np.array([0.0, 3.0, 1.0, 2.0, 5.0, 4.0])
+    x = np.arange(y.size, dtype=float)
+    frame_indices = np.array([-1, 0, 1, 3, 3, 5])
+    kept, mapped = decimate_to_frames(frame_indices, x, y, method)
+    np.testing.assert_array_equal(kept, np.arange(y.size))
+    np.testing.assert_array_equal(mapped, frame_indices)
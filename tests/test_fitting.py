@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from insitu.fitting import polyfit
+
+
+@pytest.mark.parametrize('degree', [1, 3, 6])
+def test_batch_polyfit_matches_per_curve(degree):
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(-5, 40, size=(4, 200)), axis=1)
+    y = np.sin(x / 7) * 100 + rng.normal(0, 1, x.shape)
+    model = polyfit(x, y, degree)
+
+    for i in range(x.shape[0]):
+        expected = np.polyval(np.polyfit(x[i], y[i], degree), x[i])
+        np.testing.assert_allclose(model(x)[i], expected, rtol=1e-8, atol=1e-8)
+        reference = np.polynomial.Polynomial.fit(x[i], y[i], degree)
+        np.testing.assert_allclose(model.coef[i], reference.coef, rtol=1e-8, atol=1e-8)
+        np.testing.assert_allclose(model.domain[i], reference.domain)
+
+
+def test_batch_polyfit_skips_nan():
+    rng = np.random.default_rng(1)
+    x = np.linspace(0, 10, 100)
+    y = np.stack([x ** 2 + rng.normal(0, 0.1, x.size), 3 * x - 1 + rng.normal(0, 0.1, x.size)])
+    y[1, ::7] = np.nan
+    model = polyfit(x, y, 2)
+
+    valid = ~np.isnan(y[1])
+    expected = np.polyval(np.polyfit(x[valid], y[1, valid], 2), x)
+    np.testing.assert_allclose(model(x)[1], expected, rtol=1e-8, atol=1e-8)
+    np.testing.assert_allclose(model(x)[0], np.polyval(np.polyfit(x, y[0], 2), x), rtol=1e-8, atol=1e-8)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from scipy.signal import savgol_filter
+
+from insitu.smoothing import StreamingSavgol, fit_window
+
+
+def stream(values, chunk_sizes, window_length=37, polyorder=2):
+    smoother = StreamingSavgol(window_length, polyorder)
+    outputs = []
+    start = 0
+    for size in chunk_sizes:
+        outputs.append(smoother.push(values[start:start + size]))
+        start += size
+    outputs.append(smoother.push(values[start:]))
+    outputs.append(smoother.finish())
+    return np.concatenate(outputs)
+
+
+@pytest.mark.parametrize('chunk_sizes', [[1000], [1] * 100, [5, 40, 3, 0, 200], [36, 1, 1], [37], [500, 7]])
+def test_streaming_matches_savgol_filter(chunk_sizes):
+    values = np.random.default_rng(0).normal(size=1000).cumsum()
+    expected = savgol_filter(values, 37, 2, mode='interp')
+    np.testing.assert_allclose(stream(values, chunk_sizes), expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('length', [3, 4, 10, 36])
+def test_streaming_shorter_than_window(length):
+    values = np.random.default_rng(1).normal(size=length)
+    expected = savgol_filter(values, fit_window(length), 2, mode='interp')
+    np.testing.assert_allclose(stream(values, [1] * length), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_streaming_too_short_to_fit():
+    values = np.array([1.0, 2.5])
+    np.testing.assert_array_equal(stream(values, [1]), values)
@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+import pytest
+
+from insitu.tableio import COLUMNAR_EXTENSIONS, convert_workbook, read_table, write_table
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({'Time(Sec)': ['12:00:00 000', '12:00:01 500'],
+                         'ε (%)': [0.05, 0.25],
+                         'σ (MPa)': [1.5, 120.5]})
+
+
+@pytest.mark.parametrize('ext', ('.xlsx',) + COLUMNAR_EXTENSIONS)
+def test_round_trip(tmp_path, table, ext):
+    path = str(tmp_path / f'data{ext}')
+    write_table(table, path, sheet_name='input_data')
+    pd.testing.assert_frame_equal(read_table(path, sheet_name='input_data'), table)
+
+
+@pytest.mark.parametrize('ext', ('.xlsx',) + COLUMNAR_EXTENSIONS)
+def test_round_trip_columns(tmp_path, table, ext):
+    path = str(tmp_path / f'data{ext}')
+    write_table(table, path, sheet_name='input_data')
+    result = read_table(path, sheet_name='input_data', columns=['ε (%)', 'σ (MPa)'])
+    pd.testing.assert_frame_equal(result, table[['ε (%)', 'σ (MPa)']])
+
+
+@pytest.mark.parametrize('ext', COLUMNAR_EXTENSIONS)
+def test_single_table_ignores_sheet_name(tmp_path, table, ext):
+    path = str(tmp_path / f'data{ext}')
+    assert write_table(table, path, sheet_name='Smoothed_Data') == path
+    pd.testing.assert_frame_equal(read_table(path, sheet_name='input_data'), table)
+
+
+@pytest.mark.parametrize('ext', COLUMNAR_EXTENSIONS)
+def test_converted_workbook_sheets(tmp_path, table, ext):
+    workbook = str(tmp_path / 'data.xlsx')
+    with pd.ExcelWriter(workbook) as writer:
+        table.to_excel(writer, sheet_name='input_data', index=False)
+        table.iloc[1:].to_excel(writer, sheet_name='raw', index=False)
+    written = convert_workbook(workbook, ext)
+    assert sorted(map(os.path.basename, written)) == [f'data_input_data{ext}', f'data_raw{ext}']
+
+    path = str(tmp_path / f'data{ext}')
+    pd.testing.assert_frame_equal(read_table(path, sheet_name='input_data'), table)
+    pd.testing.assert_frame_equal(read_table(path, sheet_name='raw'), table.iloc[1:].reset_index(drop=True))